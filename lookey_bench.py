@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import platform
+import tempfile
+import datetime
+import multiprocessing
+from importlib import metadata
+
+import cv2
+import numpy as np
+from colorama import Fore, Style
+
+from lookey_cli import LookeyBackend, peak_rss_mb
+
+IMAGE_KINDS = ("flat", "photo", "dark")
+DEFAULT_SIZES = (512, 1024, 2048)
+DEFAULT_THRESHOLD = 0.10
+STARTUP_COMMAND = ("contacts",)
+STARTUP_BUDGET_MS = 500
+# Light commands must not import any of these; see _LazyModule in lookey_cli.
+HEAVY_MODULES = ("cv2", "numpy", "imwatermark", "pywt", "torch", "PIL.Image", "piexif", "qrcode", "cryptography.hazmat.primitives.serialization")
+
+
+def make_image(kind, size, seed=0):
+    rng = np.random.default_rng(seed + size)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+
+    if kind == "flat":
+        base = np.full((size, size, 3), (236, 240, 244), dtype=np.float32)
+        base += (x * 6)[..., None]
+        return np.clip(base, 0, 255).astype(np.uint8)
+
+    # Luminance texture at a few scales with only a mild colour cast, like most photographs.
+    lum = 80 + 70 * x + 30 * y
+    for cell in (64, 16, 4):
+        small = rng.normal(0, 18, (max(2, size // cell), max(2, size // cell))).astype(np.float32)
+        lum += cv2.resize(small, (size, size), interpolation=cv2.INTER_CUBIC)
+    lum += rng.normal(0, 5, (size, size)).astype(np.float32)
+    img = np.stack([lum + 8 * (1 - x), lum, lum + 8 * y], axis=2)
+
+    if kind == "dark":
+        img = img * 0.2
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def _summarize(samples, megapixels):
+    p50 = _percentile(samples, 0.5)
+    return {
+        "runs": len(samples),
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "images_per_s": round(1 / p50, 3) if p50 else None,
+        "megapixels_per_s": round(megapixels / p50, 3) if p50 else None
+    }
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def run_case(kind, size, repeat):
+    work_dir = tempfile.mkdtemp(prefix="lookey_bench_")
+    try:
+        backend = LookeyBackend(os.path.join(work_dir, "data"))
+        backend.setup_user("Bench")
+        # Benchmarks must not depend on (or pollute) a learned strategy table or the verify cache.
+        backend.predict_strategy = False
+        backend.use_verify_cache = False
+
+        src = os.path.join(work_dir, f"{kind}_{size}.png")
+        cv2.imwrite(src, make_image(kind, size))
+        marked = os.path.join(work_dir, "Lookey_Marked", f"{kind}_{size}.png")
+
+        timings = {"sign_image": [], "sign_invisible": [], "verify_image": [], "verify_unsigned": [], "scan": []}
+        strategy_timings = {}
+        outcome = None
+
+        with backend.signing_session() as session:
+            for _ in range(repeat):
+                elapsed, _ = _timed(backend.sign_image, src, session)
+                timings["sign_image"].append(elapsed)
+
+                elapsed, result = _timed(backend.sign_invisible, src, session)
+                timings["sign_invisible"].append(elapsed)
+                outcome = result.msg
+
+                elapsed, _ = _timed(backend.verify_image, marked)
+                timings["verify_image"].append(elapsed)
+
+                elapsed, _ = _timed(backend.verify_image, src)
+                timings["verify_unsigned"].append(elapsed)
+
+                elapsed, _ = _timed(backend._verify_invisible_scan, marked)
+                timings["scan"].append(elapsed)
+
+            bgr = backend._load_embed_source(src)
+            encoder = backend._make_encoder(session)
+            for noise_level, strength in backend.analyze_texture(bgr).strategies():
+                samples = strategy_timings.setdefault(f"attempt_{noise_level}/{strength}", [])
+                for _ in range(repeat):
+                    elapsed, _ = _timed(backend._attempt_strategy, bgr, encoder, noise_level, strength)
+                    samples.append(elapsed)
+
+        megapixels = size * size / 1e6
+        ops = {name: _summarize(samples, megapixels) for name, samples in timings.items()}
+        ops.update({name: _summarize(samples, megapixels) for name, samples in strategy_timings.items()})
+        return {"kind": kind, "size": size, "outcome": outcome, "ops": ops, "peak_rss_mb": peak_rss_mb()}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _cli_command(*args):
+    if getattr(sys, "frozen", False):
+        return [sys.executable, *args]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lookey_cli.py"), *args]
+
+
+def measure_startup(command=STARTUP_COMMAND, repeat=5):
+    # Cold start of a whole CLI process, which is what a user typing `lookey contacts` waits for.
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(_cli_command(*command), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+
+    heavy = None
+    if not getattr(sys, "frozen", False):
+        probe = f"import sys, lookey_cli; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        heavy = [m for m in out.stdout.strip().split(",") if m]
+
+    stats = _summarize(samples, 0)
+    stats.pop("megapixels_per_s")
+    return {"command": " ".join(command), **stats, "heavy_modules_on_import": heavy}
+
+
+def check_startup(startup, budget_ms=STARTUP_BUDGET_MS):
+    print(f"{Fore.CYAN} Cold start `{startup['command']}`: p50 {startup['p50_ms']:.1f} ms, p99 {startup['p99_ms']:.1f} ms (budget {budget_ms} ms)")
+    failed = 0
+    if startup["p50_ms"] > budget_ms:
+        print(f"{Fore.RED} Startup over budget by {startup['p50_ms'] - budget_ms:.1f} ms.")
+        failed += 1
+    if startup["heavy_modules_on_import"]:
+        print(f"{Fore.RED} Importing lookey_cli loaded: {', '.join(startup['heavy_modules_on_import'])}")
+        failed += 1
+    if not failed:
+        print(f"{Fore.GREEN} Startup within budget.")
+    return failed
+
+
+def _environment():
+    versions = {}
+    for package in ("numpy", "opencv-python-headless", "opencv-python", "invisible-watermark", "Pillow", "cryptography"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+        "created": datetime.datetime.utcnow().isoformat()
+    }
+
+
+def run_bench(kinds=IMAGE_KINDS, sizes=DEFAULT_SIZES, repeat=3):
+    results = {}
+    for kind in kinds:
+        for size in sizes:
+            print(f"{Fore.CYAN} Benchmarking {kind} {size}x{size}...")
+            # A fresh process per case keeps peak RSS attributable to that case.
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                case = pool.apply(run_case, (kind, size, repeat))
+            results[f"{kind}-{size}"] = case
+            for name, stats in case["ops"].items():
+                print(f"{Style.DIM}   {name:<20} p50 {stats['p50_ms']:>10.1f} ms   p99 {stats['p99_ms']:>10.1f} ms")
+            print(f"{Style.DIM}   peak RSS {case['peak_rss_mb']} MB | {case['outcome']}")
+    return {"environment": _environment(), "startup": measure_startup(), "results": results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    regressions = []
+    for case_id, case in current["results"].items():
+        base_case = baseline["results"].get(case_id)
+        if not base_case:
+            continue
+        for name, stats in case["ops"].items():
+            base = base_case["ops"].get(name)
+            if not base or not base["p50_ms"]:
+                continue
+            change = stats["p50_ms"] / base["p50_ms"] - 1
+            regressions.append((case_id, name, base["p50_ms"], stats["p50_ms"], change, change > threshold))
+
+        base_rss, rss = base_case.get("peak_rss_mb"), case.get("peak_rss_mb")
+        if base_rss and rss:
+            change = rss / base_rss - 1
+            regressions.append((case_id, "peak_rss_mb", base_rss, rss, change, change > threshold))
+
+    base_start, start = baseline.get("startup"), current.get("startup")
+    if base_start and start and base_start["p50_ms"]:
+        change = start["p50_ms"] / base_start["p50_ms"] - 1
+        regressions.append(("startup", start["command"], base_start["p50_ms"], start["p50_ms"], change, change > threshold))
+    return regressions
+
+
+def print_comparison(rows, threshold):
+    failed = 0
+    for case_id, name, before, after, change, regressed in rows:
+        color = Fore.RED if regressed else (Fore.GREEN if change < -threshold else Style.DIM)
+        print(f"{color} {case_id:<14} {name:<20} {before:>10.1f} -> {after:>10.1f}  ({change:+.1%})")
+        failed += regressed
+    if failed:
+        print(f"{Fore.RED} {failed} regression(s) over {threshold:.0%}.")
+    else:
+        print(f"{Fore.GREEN} No regressions over {threshold:.0%}.")
+    return failed
+
+
+def main(args):
+    if args.startup:
+        return 1 if check_startup(measure_startup(repeat=args.repeat), args.startup_budget) else 0
+
+    if args.compare:
+        with open(args.compare[0], "r") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], "r") as f:
+            current = json.load(f)
+        return 1 if print_comparison(compare(baseline, current, args.threshold), args.threshold) else 0
+
+    sizes = tuple(int(v) for v in args.sizes.split(",")) if args.sizes else DEFAULT_SIZES
+    kinds = tuple(args.kinds.split(",")) if args.kinds else IMAGE_KINDS
+    report = run_bench(kinds, sizes, args.repeat)
+    failed = check_startup(report["startup"], args.startup_budget)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{Fore.GREEN} Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        failed += print_comparison(compare(baseline, report, args.threshold), args.threshold)
+    return 1 if failed else 0
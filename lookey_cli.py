@@ -4,20 +4,52 @@ import json
 import base64
 import hashlib
 import datetime
+import time
+import shutil
+import tempfile
+import random
+import fnmatch
+import sqlite3
+import struct
+import zlib
+import mmap
+import threading
 import argparse
-import piexif
-import qrcode
+import importlib
+import multiprocessing
+import multiprocessing.util
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 import io
-import cv2
-import numpy as np
-from PIL import Image, PngImagePlugin
-from cryptography.hazmat.primitives.asymmetric import ed25519
-from cryptography.hazmat.primitives import serialization
 from colorama import init, Fore, Style
-from imwatermark import WatermarkEncoder, WatermarkDecoder
 
 init(autoreset=True)
 
+class _LazyModule:
+    # Imports a heavy dependency on first attribute access, so me/contacts/--help never load it.
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# imwatermark alone pulls in torch; cv2, numpy and cryptography add a few hundred ms more.
+piexif = _LazyModule("piexif")
+qrcode = _LazyModule("qrcode")
+cv2 = _LazyModule("cv2")
+np = _LazyModule("numpy")
+Image = _LazyModule("PIL.Image")
+ImageSequence = _LazyModule("PIL.ImageSequence")
+ed25519 = _LazyModule("cryptography.hazmat.primitives.asymmetric.ed25519")
+serialization = _LazyModule("cryptography.hazmat.primitives.serialization")
+imwatermark = _LazyModule("imwatermark")
+pywt = _LazyModule("pywt")
+
 
 
 if getattr(sys, 'frozen', False):
@@ -30,69 +62,882 @@ KEY_FILE = os.path.join(DATA_DIR, "my_private_key.pem")
 PUB_FILE = os.path.join(DATA_DIR, "my_public_key.pem")
 CONFIG_FILE = os.path.join(DATA_DIR, "user_config.json")
 CONTACTS_FILE = os.path.join(DATA_DIR, "contacts.json")
+CONTACTS_DB_FILE = os.path.join(DATA_DIR, "contacts.db")
+VERIFY_CACHE_FILE = os.path.join(DATA_DIR, "verify_cache.db")
+VERIFY_CACHE_MAX_ENTRIES = 50000
+VERIFY_CACHE_SCHEMA = 2
+PUBLIC_KEY_CACHE_SIZE = 256
+SIGNATURE_CHUNK = 64
+PROBE_BATCH = 512
+STRATEGY_STATS_FILE = os.path.join(DATA_DIR, "strategy_stats.json")
+MANIFEST_FILE = os.path.join(DATA_DIR, "batch_manifest.json")
+MANIFEST_DB_FILE = os.path.join(DATA_DIR, "batch_manifest.db")
+FILE_HASH_CHUNK = 1024 * 1024
+STRATEGY_MIN_SAMPLES = 8
+STRATEGY_EXPLORE_RATE = 0.1
+TEXTURE_STRIP_PIXELS = 1024 * 1024
+# Texture-only triage before any strategy history exists: below these a Deep Embed almost never survives.
+TRIAGE_FLAT_STD = 4.0
+TRIAGE_LOW_STD = 20.0
+TRIAGE_MAX_VOID = 0.5
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TEXT_CHUNKS = (b"tEXt", b"zTXt", b"iTXt")
+EXIF_IFD_POINTER = 0x8769
+EXIF_USER_COMMENT = 0x9286
+OUTPUT_DIRS = ("Lookey_Marked", "Lookey_Tagged")
+
+# lookey_version -> pixel hash scheme. "1.0" is SHA-256 over the RGB bytes, "1.1" a SHA-256 tree over row strips.
+LOOKEY_VERSION = "1.0"
+TREE_HASH_VERSION = "1.1"
+HASH_SCHEMES = {"1.0": "linear", "1.1": "tree"}
+SEQUENCE_HASH_VERSION = "1.2"
+SEQUENCE_FRAME_MS = 100
+SEQUENCE_SCENE_DELTA = 10.0
+TREE_LEAF_ROWS = 256
+STREAM_STRIP_BYTES = 4 * 1024 * 1024
+EMBED_STRIP_ROWS = 256
+# imwatermark refuses to encode or decode anything smaller.
+MIN_EMBED_PIXELS = 256 * 256
+EMBED_BUDGET_BYTES_PER_PIXEL = 20
+PRESENCE_BLOCK_ROWS = 48
+PRESENCE_MIN_Z = 8.0
+
+class PixelHasher:
+    # Hashes RGB pixels a strip of rows at a time so no full-frame bytes copy is ever built.
+    def __init__(self, version=LOOKEY_VERSION, workers=1):
+        if version not in HASH_SCHEMES:
+            raise ValueError(f"Unsupported lookey_version: {version}")
+        self.version = version
+        self.workers = max(1, workers)
+
+    def hash_array(self, rgb):
+        rgb = np.ascontiguousarray(rgb)
+        h, w = rgb.shape[:2]
+        rows = self._strip_rows(w)
+        return self._digest(w, h, (rgb[y:y + rows] for y in range(0, h, rows)))
+
+    def hash_bgr(self, bgr):
+        # Same digest as hash_array on the RGB conversion, converting one strip at a time.
+        h, w = bgr.shape[:2]
+        rows = self._strip_rows(w)
+        return self._digest(w, h, (cv2.cvtColor(bgr[y:y + rows], cv2.COLOR_BGR2RGB) for y in range(0, h, rows)))
+
+    def hash_image(self, img):
+        w, h = img.size
+        rows = self._strip_rows(w)
+        return self._digest(w, h, (self._image_strip(img, y, rows) for y in range(0, h, rows)))
+
+    @staticmethod
+    def sequence_root(width, height):
+        # lookey_version 1.2: SHA-256 over the frame size, then each frame's linear (1.0) digest in order.
+        return hashlib.sha256(b"lookey-seq" + width.to_bytes(4, "big") + height.to_bytes(4, "big"))
+
+    def _strip_rows(self, width):
+        if HASH_SCHEMES[self.version] == "tree":
+            return TREE_LEAF_ROWS
+        return max(1, STREAM_STRIP_BYTES // max(1, width * 3))
+
+    def _image_strip(self, img, y, rows):
+        strip = img.crop((0, y, img.size[0], min(y + rows, img.size[1])))
+        if strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        return strip.tobytes()
+
+    def _digest(self, w, h, strips):
+        if HASH_SCHEMES[self.version] == "linear":
+            digest = hashlib.sha256()
+            for strip in strips:
+                digest.update(strip)
+            return digest.hexdigest()
+
+        root = hashlib.sha256(b"lookey-tree" + w.to_bytes(4, "big") + h.to_bytes(4, "big"))
+        if self.workers == 1:
+            for strip in strips:
+                root.update(hashlib.sha256(strip).digest())
+            return root.hexdigest()
+
+        # hashlib releases the GIL on large buffers, so leaves hash in parallel on threads.
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for strip in strips:
+                pending.append(pool.submit(lambda b: hashlib.sha256(b).digest(), strip))
+                if len(pending) >= self.workers * 2:
+                    root.update(pending.popleft().result())
+            while pending:
+                root.update(pending.popleft().result())
+        return root.hexdigest()
+
+class VerificationContext:
+    # Holds one file's bytes and a single decoded pixel buffer shared by the hash check and the watermark scan.
+    def __init__(self, data):
+        self.data = data
+        self.image = Image.open(io.BytesIO(data))
+        self.format = self.image.format
+        self._rgb = None
+        self._bgr = None
+        self._pixel_hashes = {}
+
+    @classmethod
+    def from_path(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        self.data = None
+
+    def content_hash(self):
+        return hashlib.sha256(self.data).hexdigest()
+
+    def metadata_json(self):
+        return find_metadata(self.data)[1]
+
+    def decode(self):
+        if self._rgb is not None or self._bgr is not None:
+            return
+        img = self.image if self.image.mode == "RGB" else self.image.convert("RGB")
+        self._rgb = np.asarray(img)
+        self.image.close()
+        self.image = None
+
+    def pixel_hash(self, version=LOOKEY_VERSION):
+        if version == SEQUENCE_HASH_VERSION and version not in self._pixel_hashes:
+            self._pixel_hashes[version] = self._sequence_hash()
+        if version not in self._pixel_hashes:
+            self.decode()
+            rgb = self._rgb if self._rgb is not None else cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB)
+            self._pixel_hashes[version] = PixelHasher(version).hash_array(rgb)
+        return self._pixel_hashes[version]
+
+    def _sequence_hash(self):
+        # Animations are re-read from the bytes and hashed one composited frame at a time.
+        with Image.open(io.BytesIO(self.data)) as img:
+            root = PixelHasher.sequence_root(*img.size)
+            hasher = PixelHasher(LOOKEY_VERSION)
+            for frame in ImageSequence.Iterator(img):
+                root.update(bytes.fromhex(hasher.hash_image(frame)))
+        return root.hexdigest()
+
+    def bgr(self):
+        if self._bgr is None:
+            self.decode()
+            self._bgr = cv2.cvtColor(self._rgb, cv2.COLOR_RGB2BGR)
+            self._rgb = None
+        return self._bgr
+
+    def release(self):
+        if self.image is not None:
+            self.image.close()
+        self.image = None
+        self._rgb = None
+        self._bgr = None
+
+class TextureReport:
+    # Texture statistics behind the deep-embed decisions, from one pass over the pixels.
+    def __init__(self, width, height, channel_mean, channel_std, void_ratio, risky_sectors, total_sectors, proxy_scale=1.0):
+        self.width = width
+        self.height = height
+        self.channel_mean = channel_mean
+        self.channel_std = channel_std
+        self.avg_std = sum(channel_std) / len(channel_std)
+        self.void_ratio = void_ratio
+        self.risky_sectors = risky_sectors
+        self.total_sectors = total_sectors
+        self.safe_for_noise = risky_sectors <= total_sectors * 0.25
+        self.proxy_scale = proxy_scale
+
+    def strategies(self):
+        strategies = [(0, 36), (0, 60)]
+        if self.safe_for_noise:
+            strategies.append((2, 50))
+            if self.avg_std < 20:
+                strategies.append((4, 90))
+        return strategies
+
+    def verdict(self):
+        # Only rules out the clear failures; texture alone cannot promise a mark survives, so the rest is "possible".
+        if self.width * self.height < MIN_EMBED_PIXELS or self.avg_std < TRIAGE_FLAT_STD or self.void_ratio > TRIAGE_MAX_VOID:
+            return "unlikely"
+        if not self.safe_for_noise and self.avg_std < TRIAGE_LOW_STD:
+            return "unlikely"
+        return "possible"
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "channel_mean": [round(v, 2) for v in self.channel_mean],
+            "channel_std": [round(v, 2) for v in self.channel_std],
+            "avg_std": round(self.avg_std, 2),
+            "void_ratio": round(self.void_ratio, 4),
+            "risky_sectors": self.risky_sectors,
+            "safe_for_noise": self.safe_for_noise,
+            "proxy_scale": round(self.proxy_scale, 4)
+        }
+
+class EmbedWorkspace:
+    # Work buffers for one image's strategy attempts under a memory budget, reused by every attempt.
+    # Noise, dwtDct encode and the watermark decode run in row strips that start on 8-row boundaries
+    # (one 4x4 DCT block after the Haar level), so the output is bit-identical to imwatermark's whole-frame pass.
+    def __init__(self, shape, strip_rows=EMBED_STRIP_ROWS):
+        self.shape = shape
+        self.strip_rows = max(8, strip_rows // 8 * 8)
+        self.noisy = np.empty(shape, np.uint8)
+        self.encoded = np.empty(shape, np.uint8)
+
+    def _strips(self):
+        h = self.shape[0]
+        y = 0
+        while y < h:
+            # A tail shorter than one block row is folded into the strip before it.
+            end = h if h - (y + self.strip_rows) < 8 else y + self.strip_rows
+            yield y, end
+            y = end
+
+    def add_noise(self, bgr, noise_level):
+        # Same result as adding float noise and truncating: pixel + floor(noise), clipped, in int16 per strip.
+        for y0, y1 in self._strips():
+            noisy = bgr[y0:y1].astype(np.int16)
+            noise = np.floor(np.random.normal(0, noise_level, (y1 - y0, self.shape[1]))).astype(np.int16)
+            noisy += noise[..., None]
+            np.clip(noisy, 0, 255, out=noisy)
+            self.noisy[y0:y1] = noisy
+        return self.noisy
+
+    def _block_offset(self, y, bits):
+        # Index of the first watermark bit in the strip starting at row y.
+        return (y // 8) * (self.shape[1] // 8) % bits
+
+    def encode(self, bgr, encoder, strength):
+        # Same refusal as WatermarkEncoder.encode, which the strips would otherwise bypass.
+        if bgr.shape[0] * bgr.shape[1] < MIN_EMBED_PIXELS:
+            raise RuntimeError("image too small, should be larger than 256x256")
+        bits = list(encoder._watermarks)
+        for y0, y1 in self._strips():
+            k = self._block_offset(y0, len(bits))
+            embed = imwatermark.maxDct.EmbedMaxDct(bits[k:] + bits[:k], wmLen=len(bits), scales=[0, strength, 0])
+            self.encoded[y0:y1] = embed.encode(bgr[y0:y1])
+        return self.encoded
+
+    def decode(self, bgr, length=64):
+        # Mirrors WatermarkDecoder('bytes', 64).decode(bgr, 'dwtDct'); returns None where it would raise.
+        try:
+            if bgr is None or bgr.shape[0] * bgr.shape[1] < MIN_EMBED_PIXELS:
+                return None
+            embed = imwatermark.maxDct.EmbedMaxDct(watermarks=[], wmLen=length)
+            cols = bgr.shape[1] // 4 * 4
+            scores = [[] for _ in range(length)]
+            for y0, y1 in self._strips():
+                yuv = cv2.cvtColor(bgr[y0:y1], cv2.COLOR_BGR2YUV)
+                ca1, _ = pywt.dwt2(yuv[:(y1 - y0) // 4 * 4, :cols, 1], 'haar')
+                k = self._block_offset(y0, length)
+                embed.decode_frame(ca1, embed._scales[1], scores[k:] + scores[:k])
+            bits = np.array([np.array(s).mean() for s in scores]) * 255 > 127
+            return imwatermark.WatermarkDecoder('bytes', length).reconstruct(bits)
+        except Exception:
+            return None
 
-class LookeyBackend:
+    @staticmethod
+    def estimate_mb(width, height):
+        # Working set of a budgeted deep embed on top of the process baseline, measured on noisy photos.
+        return width * height * EMBED_BUDGET_BYTES_PER_PIXEL / (1024 * 1024)
+
+class SignResult:
+    # Outcome of a sign or deep-embed call, with per-stage timings in seconds.
+    def __init__(self, success, msg, source_path=None, output_path=None, mode=None, strategy=None, attempts=0, timings=None, reused=None):
+        self.success = success
+        self.msg = msg
+        self.source_path = source_path
+        self.output_path = output_path
+        self.mode = mode
+        self.strategy = strategy
+        self.attempts = attempts
+        self.timings = timings or {}
+        self.reused = reused
+        self.peak_rss_mb = None
+
+    @property
+    def outcome(self):
+        return self.mode if self.success else "error"
+
+    def to_dict(self):
+        return {
+            "success": self.success,
+            "msg": self.msg,
+            "source_path": self.source_path,
+            "output_path": self.output_path,
+            "mode": self.mode,
+            "strategy": f"{self.strategy[0]}/{self.strategy[1]}" if self.strategy else None,
+            "attempts": self.attempts,
+            "reused": self.reused,
+            "peak_rss_mb": self.peak_rss_mb,
+            "timings_ms": {stage: round(t * 1000, 2) for stage, t in self.timings.items()}
+        }
+
+class StageProfiler:
+    # Aggregates per-stage timings from results, including those computed in pool workers.
     def __init__(self):
-        os.makedirs(DATA_DIR, exist_ok=True)
+        self.stages = {}
+        self.attempts = 0
+        self.operations = 0
+        self.started = time.perf_counter()
+
+    def add(self, timings, attempts=0):
+        self.operations += 1
+        self.attempts += attempts
+        for stage, elapsed in timings.items():
+            entry = self.stages.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+
+    def add_result(self, result):
+        if isinstance(result, SignResult):
+            self.add(result.timings, result.attempts)
+        elif isinstance(result, dict):
+            self.add(result.get("timings", {}))
+
+    def to_dict(self):
+        return {
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "operations": self.operations,
+            "strategy_attempts": self.attempts,
+            "stages": {
+                stage: {
+                    "count": e["count"],
+                    "total_s": round(e["total_s"], 4),
+                    "mean_ms": round(e["total_s"] / e["count"] * 1000, 2),
+                    "max_ms": round(e["max_s"] * 1000, 2)
+                } for stage, e in sorted(self.stages.items(), key=lambda item: -item[1]["total_s"])
+            }
+        }
+
+class StrategyPlanner:
+    # Learns which deep-embed strategy first survives for each texture bucket and starts there next time.
+    def __init__(self, path=STRATEGY_STATS_FILE):
+        self.path = path
+        self.table = self._load()
+        self.pending = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def bucket(self, avg_std, void_ratio, safe_for_noise):
+        std_bucket = min(int(avg_std // 8), 12)
+        void_bucket = min(int(void_ratio * 10), 9)
+        return f"{std_bucket}:{void_bucket}:{int(safe_for_noise)}"
+
+    def _key(self, strategy):
+        return "none" if strategy is None else f"{strategy[0]}/{strategy[1]}"
+
+    def plan(self, bucket, strategies):
+        stats = self.table.get(bucket, {})
+        if sum(stats.values()) < STRATEGY_MIN_SAMPLES:
+            return strategies
+
+        keys = [self._key(st) for st in strategies]
+        best = max(keys + ["none"], key=lambda k: stats.get(k, 0))
+        start = keys.index(best) if best != "none" else len(strategies) - 1
+        return strategies[start:] + strategies[:start]
+
+    def predict(self, bucket, strategies):
+        stats = self.table.get(bucket, {})
+        total = sum(stats.values())
+        if total < STRATEGY_MIN_SAMPLES:
+            return None, None
+
+        keys = [self._key(st) for st in strategies]
+        successes = sum(stats.get(k, 0) for k in keys)
+        best = max(keys, key=lambda k: stats.get(k, 0))
+        return (best if successes else None), successes / total
+
+    def record(self, bucket, strategy):
+        key = self._key(strategy)
+        for table in (self.table, self.pending):
+            table.setdefault(bucket, {})
+            table[bucket][key] = table[bucket].get(key, 0) + 1
+        if sum(sum(v.values()) for v in self.pending.values()) >= 20:
+            self.save()
+
+    def save(self):
+        if not self.pending:
+            return
+        table = self._load()
+        for bucket, counts in self.pending.items():
+            table.setdefault(bucket, {})
+            for key, count in counts.items():
+                table[bucket][key] = table[bucket].get(key, 0) + count
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(table, f)
+            os.replace(temp_path, self.path)
+            self.table = table
+            self.pending = {}
+        except OSError:
+            pass
+
+class BatchManifest:
+    # Remembers what batch-embed produced for each source content hash so reruns only touch new or changed files.
+    # Rows are upserted one at a time, so a run never rewrites the whole manifest and a GUI and a CLI batch can share it.
+    def __init__(self, path=MANIFEST_DB_FILE, legacy_path=None):
+        self.path = path
+        self.force = False
+        self.fresh = set()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS content ("
+                "digest TEXT PRIMARY KEY, signer TEXT NOT NULL, lookey_version TEXT NOT NULL, mode TEXT, strategy TEXT, updated TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "digest TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, PRIMARY KEY (digest, path))"
+            )
+        if legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+
+    def _migrate(self, legacy_path):
+        try:
+            with open(legacy_path, "r") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO files VALUES (?, ?, ?, ?)",
+                ((path, f["size"], f["mtime_ns"], f["sha256"]) for path, f in legacy.get("files", {}).items())
+            )
+            for digest, entry in legacy.get("content", {}).items():
+                strategy = json.dumps(entry["strategy"]) if entry.get("strategy") else None
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO content VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, entry["signer"], entry["lookey_version"], entry.get("mode"), strategy, entry.get("updated"))
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO outputs VALUES (?, ?, ?, ?)",
+                    ((digest, out, stamp[0], stamp[1]) for out, stamp in entry.get("outputs", {}).items())
+                )
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except OSError:
+            pass
+
+    def digest(self, path):
+        # Size and mtime are only a shortcut; the content hash is the real key.
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(FILE_HASH_CHUNK), b""):
+                h.update(chunk)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, h.hexdigest()))
+        return h.hexdigest()
+
+    def _entry(self, digest, signer, version):
+        with self.lock:
+            row = self.conn.execute("SELECT signer, lookey_version, mode, strategy FROM content WHERE digest = ?", (digest,)).fetchone()
+            if not row or row[0] != signer or row[1] != version:
+                return None
+            outputs = self.conn.execute("SELECT path, size, mtime_ns FROM outputs WHERE digest = ? ORDER BY rowid", (digest,)).fetchall()
+        return {"mode": row[2], "strategy": json.loads(row[3]) if row[3] else None, "outputs": {out: [size, mtime] for out, size, mtime in outputs}}
+
+    def _output_intact(self, output_path, stamp):
+        try:
+            st = os.stat(output_path)
+        except OSError:
+            return False
+        return [st.st_size, st.st_mtime_ns] == stamp
+
+    def reuse(self, image_path, digest, signer, version):
+        # --force still lets duplicates within this run share the freshly written output.
+        if self.force and digest not in self.fresh:
+            return None
+        entry = self._entry(digest, signer, version)
+        if not entry:
+            return None
+
+        output_path = os.path.abspath(marked_output_path(image_path))
+        name = os.path.basename(output_path)
+        strategy = tuple(entry["strategy"]) if entry["strategy"] else None
+        if self._output_intact(output_path, entry["outputs"].get(output_path)):
+            msg = f"Unchanged. Kept Lookey_Marked/{name}"
+            return SignResult(True, msg, image_path, output_path, entry["mode"], strategy, reused="unchanged")
+
+        source = next((out for out, stamp in entry["outputs"].items() if self._output_intact(out, stamp)), None)
+        if source is None:
+            return None
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        shutil.copyfile(source, output_path)
+        self._add_output(digest, output_path)
+        msg = f"Duplicate content. Copied to Lookey_Marked/{name}"
+        return SignResult(True, msg, image_path, output_path, entry["mode"], strategy, reused="duplicate")
+
+    def record(self, digest, result, signer, version):
+        if not result.success:
+            return
+        self.fresh.add(digest)
+        strategy = json.dumps(list(result.strategy)) if result.strategy else None
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT signer, lookey_version FROM content WHERE digest = ?", (digest,)).fetchone()
+            if row and (row[0] != signer or row[1] != version):
+                # Outputs signed by another key or hash version cannot be reused for this one.
+                self.conn.execute("DELETE FROM outputs WHERE digest = ?", (digest,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, signer, version, result.mode, strategy, datetime.datetime.utcnow().isoformat())
+            )
+        self._add_output(digest, os.path.abspath(result.output_path))
+
+    def _add_output(self, digest, output_path):
+        st = os.stat(output_path)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)", (digest, output_path, st.st_size, st.st_mtime_ns))
+
+    def close(self):
+        self.conn.close()
+
+class ContactStore:
+    # SQLite contact book keyed by fingerprint, with each key's watermark ID stored for the deep-embed index.
+    def __init__(self, path=CONTACTS_DB_FILE, legacy_path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS contacts ("
+                "fingerprint TEXT PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL, id_prefix TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS contacts_id_prefix ON contacts (id_prefix)")
+        if legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+        self._data_version = self._version()
+
+    def _migrate(self, legacy_path):
+        # Several processes may start at once (pool workers); whoever gets there first moves the file.
+        try:
+            with open(legacy_path, "r") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO contacts VALUES (?, ?, ?, ?)",
+                ((fp, data["name"], data["key"], identity_hash(data["key"])) for fp, data in legacy.items())
+            )
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except OSError:
+            pass
+
+    def _version(self):
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self):
+        # data_version moves when another connection (CLI, GUI, server worker) commits.
+        version = self._version()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        return True
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __contains__(self, fingerprint):
+        return self.get(fingerprint) is not None
+
+    def __getitem__(self, fingerprint):
+        data = self.get(fingerprint)
+        if data is None:
+            raise KeyError(fingerprint)
+        return data
+
+    def get(self, fingerprint, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT name, key FROM contacts WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return {"name": row[0], "key": row[1]} if row else default
+
+    def items(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT fingerprint, name, key FROM contacts ORDER BY rowid").fetchall()
+        return [(fp, {"name": name, "key": key}) for fp, name, key in rows]
+
+    def values(self):
+        return [data for _, data in self.items()]
+
+    def id_prefixes(self):
+        with self.lock:
+            return self.conn.execute("SELECT name, id_prefix FROM contacts ORDER BY rowid").fetchall()
+
+    def add_many(self, contacts):
+        # One transaction for the whole batch; re-adding a fingerprint renames it, like add-contact always did.
+        with self.lock, self.conn:
+            before = self.conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+            cur = self.conn.executemany(
+                "INSERT INTO contacts VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (fingerprint) DO UPDATE SET name = excluded.name, key = excluded.key",
+                ((fp, name, key, identity_hash(key)) for fp, name, key in contacts)
+            )
+            written = cur.rowcount
+            added = self.conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0] - before
+        return added, written - added
+
+    def close(self):
+        self.conn.close()
+
+class VerifyCache:
+    # Content hash -> verification facts (signature outcome, signer, raw watermark bytes), evicted least recently used.
+    def __init__(self, path=VERIFY_CACHE_FILE, max_entries=VERIFY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.puts = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        try:
+            self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] != VERIFY_CACHE_SCHEMA:
+                with self.conn:
+                    self.conn.execute("DROP TABLE IF EXISTS results")
+                    self.conn.execute(f"PRAGMA user_version = {VERIFY_CACHE_SCHEMA}")
+            with self.conn:
+                self.conn.execute("CREATE TABLE IF NOT EXISTS results (digest TEXT PRIMARY KEY, facts TEXT NOT NULL, last_used REAL NOT NULL)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        except sqlite3.Error:
+            self.conn = None
+
+    def get(self, digest):
+        if self.conn is None:
+            return None
+        # The cache is only an accelerator: a locked or damaged database just means a miss.
+        try:
+            with self.lock, self.conn:
+                row = self.conn.execute("SELECT facts FROM results WHERE digest = ?", (digest,)).fetchone()
+                if row is None:
+                    return None
+                self.conn.execute("UPDATE results SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def put(self, digest, facts):
+        if self.conn is None:
+            return
+        try:
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (digest, json.dumps(facts), time.time()))
+                self.puts += 1
+                if self.puts % 100 == 0:
+                    self.conn.execute(
+                        "DELETE FROM results WHERE digest IN (SELECT digest FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+        except sqlite3.Error:
+            pass
+
+class PublicKeyCache:
+    # Parsed signer keys and their fingerprints by PEM bytes; a folder of images usually comes from a handful of signers.
+    def __init__(self, max_entries=PUBLIC_KEY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def get(self, pem_bytes):
+        with self.lock:
+            entry = self._keys.get(pem_bytes)
+            if entry is not None:
+                self._keys.move_to_end(pem_bytes)
+                return entry
+        entry = (serialization.load_pem_public_key(pem_bytes), hashlib.sha256(pem_bytes).hexdigest())
+        with self.lock:
+            self._keys[pem_bytes] = entry
+            if len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+        return entry
+
+    def verify(self, pem_bytes, signature, message):
+        # Returns the signer fingerprint, or None if the key or signature is bad.
+        try:
+            public_key, fingerprint = self.get(pem_bytes)
+            public_key.verify(signature, message)
+            return fingerprint
+        except Exception:
+            return None
+
+class SigningSession:
+    # Loads the key pair once so many files can be signed with only the pixel work per image.
+    def __init__(self, backend):
+        self.backend = backend
+        self.private_key = None
+        self.pubkey_b64 = None
+        self.identity_hash = None
+
+    def open(self):
+        with open(self.backend.key_file, "rb") as f:
+            self.private_key = serialization.load_pem_private_key(f.read(), password=None)
+        with open(self.backend.pub_file, "rb") as f:
+            self.pubkey_b64 = base64.b64encode(f.read()).decode('utf-8')
+        self.identity_hash = self.backend._identity_hash(self.pubkey_b64)
+        return self
+
+    def close(self):
+        self.private_key = None
+        self.backend.planner.save()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def build_metadata(self, pixel_hash, version=LOOKEY_VERSION):
+        payload_data = {
+            "pixel_hash": pixel_hash,
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "author": self.backend.user_name
+        }
+        payload_json = json.dumps(payload_data, sort_keys=True)
+        signature = self.private_key.sign(payload_json.encode('utf-8'))
+
+        metadata_dict = {
+            "lookey_version": version,
+            "payload": payload_data,
+            "signature": base64.b64encode(signature).decode('utf-8'),
+            "signer_pubkey": self.pubkey_b64
+        }
+        return json.dumps(metadata_dict)
+
+    def sign(self, image_path):
+        return self.backend.sign_image(image_path, self)
+
+    def deep_embed(self, image_path):
+        return self.backend.sign_invisible(image_path, self)
+
+class LookeyBackend:
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir or DATA_DIR
+        self.key_file = os.path.join(self.data_dir, os.path.basename(KEY_FILE))
+        self.pub_file = os.path.join(self.data_dir, os.path.basename(PUB_FILE))
+        self.config_file = os.path.join(self.data_dir, os.path.basename(CONFIG_FILE))
+        self.contacts_file = os.path.join(self.data_dir, os.path.basename(CONTACTS_FILE))
+        self.contacts_db_file = os.path.join(self.data_dir, os.path.basename(CONTACTS_DB_FILE))
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._id_index = None
+        self._my_pubkey_b64 = None
+        self.hash_version = LOOKEY_VERSION
+        self.hash_workers = 1
+        self.planner = StrategyPlanner(os.path.join(self.data_dir, os.path.basename(STRATEGY_STATS_FILE)))
+        self.predict_strategy = True
+        self.parallel_strategies = False
+        self.max_memory_mb = None
+        self.use_verify_cache = True
+        self.watermark_prefilter = False
+        self._verify_cache = None
+        self.key_cache = PublicKeyCache()
+        self.hooks = []
         self.load_contacts()
         self.user_name = self.load_config()
 
     def is_setup(self):
-        return os.path.exists(KEY_FILE) and self.user_name is not None
+        return os.path.exists(self.key_file) and self.user_name is not None
 
     def setup_user(self, display_name):
         print(f" Generating secure identity for {display_name}...")
         private_key = ed25519.Ed25519PrivateKey.generate()
         public_key = private_key.public_key()
 
-        with open(KEY_FILE, "wb") as f:
+        with open(self.key_file, "wb") as f:
             f.write(private_key.private_bytes(
                 serialization.Encoding.PEM,
                 serialization.PrivateFormat.PKCS8,
                 serialization.NoEncryption()
             ))
 
-        with open(PUB_FILE, "wb") as f:
+        with open(self.pub_file, "wb") as f:
             f.write(public_key.public_bytes(
                 serialization.Encoding.PEM,
                 serialization.PublicFormat.SubjectPublicKeyInfo
             ))
 
         self.user_name = display_name
-        with open(CONFIG_FILE, "w") as f:
+        self._my_pubkey_b64 = None
+        self._invalidate_id_index()
+        with open(self.config_file, "w") as f:
             json.dump({"display_name": display_name}, f)
         return True
 
     def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r") as f:
+        if os.path.exists(self.config_file):
+            with open(self.config_file, "r") as f:
                 return json.load(f).get("display_name")
         return None
 
     def get_my_public_key_string(self):
-        if not os.path.exists(PUB_FILE):
-            return None
-        with open(PUB_FILE, "rb") as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        if self._my_pubkey_b64 is None:
+            if not os.path.exists(self.pub_file):
+                return None
+            with open(self.pub_file, "rb") as f:
+                self._my_pubkey_b64 = base64.b64encode(f.read()).decode('utf-8')
+        return self._my_pubkey_b64
 
     def load_contacts(self):
-        if os.path.exists(CONTACTS_FILE):
-            with open(CONTACTS_FILE, "r") as f:
-                self.contacts = json.load(f)
-        else:
-            self.contacts = {}
+        # contacts.json from older versions is moved into the database on first start.
+        self.contacts = ContactStore(self.contacts_db_file, self.contacts_file)
+        self._invalidate_id_index()
+
+    def refresh_contacts(self):
+        # Long-lived backends (serve) pick up contacts added by other processes.
+        if self.contacts.changed():
+            self._invalidate_id_index()
+
+    def _contact_row(self, name, pubkey_b64):
+        pubkey_bytes = base64.b64decode(pubkey_b64)
+        return hashlib.sha256(pubkey_bytes).hexdigest(), name, pubkey_b64
 
     def add_contact(self, name, pubkey_b64):
         try:
-            pubkey_bytes = base64.b64decode(pubkey_b64)
-            fingerprint = hashlib.sha256(pubkey_bytes).hexdigest()
-            self.contacts[fingerprint] = {"name": name, "key": pubkey_b64}
-            with open(CONTACTS_FILE, "w") as f:
-                json.dump(self.contacts, f, indent=4)
+            self.contacts.add_many([self._contact_row(name, pubkey_b64)])
+            self._invalidate_id_index()
             return True, f"Added {name} to trusted contacts."
         except Exception as e:
             return False, "Invalid Key Format"
 
+    def import_contacts(self, invites):
+        # invites: iterable of (name, key). Returns (added, updated, rejected).
+        rejected = []
+
+        def rows():
+            for name, key in invites:
+                try:
+                    yield self._contact_row(name, key)
+                except Exception:
+                    rejected.append(name)
+
+        added, updated = self.contacts.add_many(rows())
+        self._invalidate_id_index()
+        return added, updated, rejected
+
     def rotate_identity(self):
 
         if not self.is_setup():
@@ -105,12 +950,12 @@ class LookeyBackend:
             
             self.add_contact(archive_name, current_pub)
             
-            archive_dir = os.path.join(DATA_DIR, "archive_keys")
+            archive_dir = os.path.join(self.data_dir, "archive_keys")
             os.makedirs(archive_dir, exist_ok=True)
             
             import shutil
-            shutil.copy(KEY_FILE, os.path.join(archive_dir, f"private_{timestamp}.pem"))
-            shutil.copy(PUB_FILE, os.path.join(archive_dir, f"public_{timestamp}.pem"))
+            shutil.copy(self.key_file, os.path.join(archive_dir, f"private_{timestamp}.pem"))
+            shutil.copy(self.pub_file, os.path.join(archive_dir, f"public_{timestamp}.pem"))
 
             self.setup_user(self.user_name)
             
@@ -119,53 +964,48 @@ class LookeyBackend:
         except Exception as e:
             return False, f"Rotation failed: {str(e)}"
                 
-    def _inject_jpeg(self, path, json_str):
+    def _inject_jpeg(self, data, json_str):
+            # Only the APP1 segment is replaced; the compressed scan data is copied untouched.
             try:
-                exif_dict = piexif.load(path)
+                exif_dict = piexif.load(data)
             except:
                 exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "Interop": {}, "1st": {}, "thumbnail": None}
             
             exif_dict["Exif"][piexif.ExifIFD.UserComment] = json_str.encode('utf-8')
             exif_bytes = piexif.dump(exif_dict)
-            piexif.insert(exif_bytes, path)
+            out = io.BytesIO()
+            piexif.insert(exif_bytes, data, out)
+            return out.getvalue()
 
-    def _inject_png(self, path, img_obj, json_str):
-            meta = PngImagePlugin.PngInfo()
-            meta.add_text("LookeyData", json_str)
-            img_obj.save(path, "PNG", pnginfo=meta)
+    def _inject_png(self, data, json_str):
+            return png_with_text(data, "LookeyData", json_str)
             
-    def sign_image(self, image_path):
+    def signing_session(self):
+        return SigningSession(self)
+
+    def sign_image(self, image_path, session=None):
         if not self.is_setup():
-            return False, "Setup required first."
+            return SignResult(False, "Setup required first.", image_path)
 
+        timings = {}
         try:
-            img = Image.open(image_path)
+            if session is None:
+                with self.signing_session() as session:
+                    return self.sign_image(image_path, session)
+
+            with self._span("decode", timings):
+                with open(image_path, "rb") as f:
+                    data = f.read()
+                img = Image.open(io.BytesIO(data))
+                img.load()
             fmt = img.format
+            if fmt not in ("JPEG", "PNG"):
+                return SignResult(False, f"Unsupported format: {fmt}", image_path, timings=timings)
             
-            pixel_hash = self._get_image_pixel_hash(image_path)
-            timestamp = datetime.datetime.utcnow().isoformat()
-            
-            payload_data = {
-                "pixel_hash": pixel_hash,
-                "timestamp": timestamp,
-                "author": self.user_name
-            }
-            payload_json = json.dumps(payload_data, sort_keys=True)
-            
-            with open(KEY_FILE, "rb") as f:
-                private_key = serialization.load_pem_private_key(f.read(), password=None)
-            signature = private_key.sign(payload_json.encode('utf-8'))
-            
-            with open(PUB_FILE, "rb") as f:
-                my_pub_key_bytes = f.read()
-
-            metadata_dict = {
-                "lookey_version": "1.0",
-                "payload": payload_data,
-                "signature": base64.b64encode(signature).decode('utf-8'),
-                "signer_pubkey": base64.b64encode(my_pub_key_bytes).decode('utf-8')
-            }
-            json_str = json.dumps(metadata_dict)
+            with self._span("hash", timings):
+                pixel_hash = self._hasher().hash_image(img)
+            with self._span("sign", timings):
+                json_str = session.build_metadata(pixel_hash, self.hash_version)
 
             parent_dir = os.path.dirname(image_path)
             filename = os.path.basename(image_path)
@@ -175,328 +1015,903 @@ class LookeyBackend:
             
             output_path = os.path.join(save_dir, filename)
             
-            img.save(output_path, quality=100, subsampling=0) 
-
-            if fmt == "JPEG":
-                self._inject_jpeg(output_path, json_str)
-            elif fmt == "PNG":
-                img_copy = Image.open(output_path)
-                self._inject_png(output_path, img_copy, json_str)
-            else:
-                return False, f"Unsupported format: {fmt}"
+            # The original bytes are kept and only the metadata is spliced in, so the pixels are never re-encoded.
+            with self._span("write", timings):
+                if fmt == "JPEG":
+                    signed = self._inject_jpeg(data, json_str)
+                else:
+                    signed = self._inject_png(data, json_str)
+                with open(output_path, "wb") as f:
+                    f.write(signed)
 
-            return True, f"Saved to: Lookey_Tagged/{filename}"
+            return SignResult(True, f"Saved to: Lookey_Tagged/{filename}", image_path, output_path, "standard", timings=timings)
 
         except Exception as e:
-            return False, str(e)
+            return SignResult(False, str(e), image_path, timings=timings)
     
     def verify_image(self, image_path):
+        return self._verify(lambda: VerificationContext.from_path(image_path))
+
+    def verify_bytes(self, data):
+        return self._verify(lambda: VerificationContext(data))
+
+    def _verify(self, open_ctx):
+        timings = {}
         try:
-            meta_report = "Metadata: Missing"
-            spy_report = " Deep Embed: Missing"
-            
-            final_status = "NO_SIG"
-            final_timestamp = "Unknown"
-            is_trusted = False
-
-            img = Image.open(image_path)
-            raw_json = None
-            if img.format == "PNG":
-                raw_json = img.info.get("LookeyData")
-            if not raw_json:
-                raw_json = self._extract_exif_metadata(image_path)
-            
-            if raw_json:
-                try:
-                    if isinstance(raw_json, str): metadata = json.loads(raw_json)
-                    else: metadata = raw_json
+            with self._span("read", timings):
+                ctx = open_ctx()
+            with ctx:
+                res = self._verify_context(ctx, timings)
+            res["timings"] = timings
+            return res
 
-                    payload = metadata["payload"]
-                    signature = base64.b64decode(metadata["signature"])
-                    signer_pubkey_bytes = base64.b64decode(metadata["signer_pubkey"])
-                    public_key = serialization.load_pem_public_key(signer_pubkey_bytes)
+        except Exception as e:
+            return {"status": "INVALID", "msg": f"Verification Error: {str(e)}", "timings": timings}
+
+    def _verify_context(self, ctx, timings):
+        # Signature and watermark facts depend only on the file bytes, so they are cached by content hash;
+        # names and trust are resolved against the current contacts on every call.
+        cache = self._get_verify_cache()
+        if cache is None:
+            return self._resolve_verification(self._verify_facts(ctx, timings))
+
+        with self._span("cache", timings):
+            digest = ctx.content_hash()
+            facts = cache.get(digest)
+        if facts is None:
+            facts = self._verify_facts(ctx, timings)
+            if not facts.get("prefiltered"):
+                cache.put(digest, facts)
+        ctx.release()
+        return self._resolve_verification(facts)
+
+    def _verify_facts(self, ctx, timings):
+        facts = {"metadata": "MISSING", "fingerprint": None, "author": None, "signed_at": None, "watermark": None}
+
+        with self._span("metadata", timings):
+            try:
+                raw_json = ctx.metadata_json()
+            except (ValueError, struct.error, zlib.error):
+                raw_json = None
+        
+        if raw_json:
+            try:
+                if isinstance(raw_json, str): metadata = json.loads(raw_json)
+                else: metadata = raw_json
+
+                payload = metadata["payload"]
+                signature = base64.b64decode(metadata["signature"])
+                signer_pubkey_bytes = base64.b64decode(metadata["signer_pubkey"])
+                with self._span("signature", timings):
+                    public_key, fingerprint = self.key_cache.get(signer_pubkey_bytes)
                     
                     payload_check_json = json.dumps(payload, sort_keys=True)
                     public_key.verify(signature, payload_check_json.encode('utf-8'))
 
-                    current_pixel_hash = self._get_image_pixel_hash(image_path)
-                    
-                    if current_pixel_hash == payload["pixel_hash"]:
-                        fingerprint = hashlib.sha256(signer_pubkey_bytes).hexdigest()
-                        user = payload['author']
-                        if fingerprint in self.contacts:
-                            user = self.contacts[fingerprint]['name']
-                            is_trusted = True
-                        
-                        meta_report = f"Metadata: VALID ({user})"
-                        final_timestamp = payload["timestamp"]
-                        if final_status == "NO_SIG": final_status = "TRUSTED" if is_trusted else "UNKNOWN_AUTHOR"
-                    else:
-                        meta_report = "Metadata: INVALID (Pixels Modified)"
-                        final_status = "TAMPERED"
-                except Exception as e:
-                    meta_report = "Metadata: CORRUPTED"
-
-            scan_result = self._verify_invisible_scan(image_path)
+                with self._span("decode", timings):
+                    ctx.decode()
+                with self._span("hash", timings):
+                    current_pixel_hash = ctx.pixel_hash(metadata.get("lookey_version", LOOKEY_VERSION))
+                
+                if current_pixel_hash == payload["pixel_hash"]:
+                    facts["metadata"] = "VALID"
+                    facts["fingerprint"] = fingerprint
+                    facts["author"] = payload["author"]
+                    facts["signed_at"] = payload["timestamp"]
+                else:
+                    facts["metadata"] = "INVALID"
+            except Exception as e:
+                facts["metadata"] = "CORRUPTED"
+
+        with self._span("decode", timings):
+            ctx.decode()
+        # With the opt-in pre-filter, images that fail the sampled presence test skip the full decode.
+        # That negative is a guess, so such facts are not cached.
+        present = True
+        if self.watermark_prefilter:
+            with self._span("presence", timings):
+                present = self._watermark_presence(ctx.bgr()) >= PRESENCE_MIN_Z
+            facts["prefiltered"] = not present
+        raw_bytes = None
+        if present:
+            with self._span("scan", timings):
+                raw_bytes = self._decode_watermark(ctx.bgr())
+        ctx.release()
+
+        if raw_bytes:
+            facts["watermark"] = raw_bytes.hex()
+        return facts
+
+    def _resolve_verification(self, facts):
+        meta_report = "Metadata: Missing"
+        spy_report = " Deep Embed: Missing"
+        
+        final_status = "NO_SIG"
+        final_timestamp = "Unknown"
+        is_trusted = False
+        meta_state = facts["metadata"]
+        signer = None
+
+        if meta_state == "VALID":
+            user = facts["author"]
+            contact = self.contacts.get(facts["fingerprint"])
+            if contact:
+                user = contact['name']
+                is_trusted = True
+
+            meta_report = f"Metadata: VALID ({user})"
+            signer = user
+            final_timestamp = facts["signed_at"]
+            final_status = "TRUSTED" if is_trusted else "UNKNOWN_AUTHOR"
+        elif meta_state == "INVALID":
+            meta_report = "Metadata: INVALID (Pixels Modified)"
+            final_status = "TAMPERED"
+        elif meta_state == "CORRUPTED":
+            meta_report = "Metadata: CORRUPTED"
+
+        scan_result = None
+        if facts["watermark"]:
+            scan_result = self._resolve_watermark(bytes.fromhex(facts["watermark"]))
+        
+        id_candidates = []
+        deep_embed = None
+        if scan_result:
+            deep_embed = {"name": scan_result["name"], "raw_id": scan_result["raw_id"], "timestamp": scan_result["timestamp"]}
+            found_time = scan_result["timestamp"]
+            if scan_result["name"]:
+                name = scan_result["name"]
+                id_candidates = [n for n, _ in scan_result["candidates"]]
+                spy_report = f" Deep Embed: FOUND ({name})"
+                
+                if final_status == "NO_SIG":
+                    final_timestamp = f"~{found_time}"
+                    final_status = "TRUSTED"
             
-            if scan_result:
-                if len(scan_result) == 2:
-                    name, time = scan_result
-                    spy_report = f" Deep Embed: FOUND ({name})"
-                    
-                    if final_status == "NO_SIG":
-                        final_timestamp = f"~{time}"
-                        final_status = "TRUSTED"
+            else:
+                raw_id = scan_result["raw_id"]
+                spy_report = f"Deep Embed: UNKNOWN ID ({raw_id[:6]}...)"
                 
-                elif len(scan_result) == 3:
-                    _, time, raw_id = scan_result
-                    spy_report = f"Deep Embed: UNKNOWN ID ({raw_id[:6]}...)"
-                    
-                    if final_status == "NO_SIG":
-                        final_status = "UNKNOWN_AUTHOR"
-                        final_timestamp = f"~{time}"
+                if final_status == "NO_SIG":
+                    final_status = "UNKNOWN_AUTHOR"
+                    final_timestamp = f"~{found_time}"
+
+        if "Missing" in meta_report and "Missing" in spy_report:
+            return {"status": "NO_SIG", "msg": "No Lookey signature found.", "metadata": meta_state, "deep_embed": None}
 
-            if "Missing" in meta_report and "Missing" in spy_report:
-                return {"status": "NO_SIG", "msg": "No Lookey signature found."}
+        full_msg = f"{meta_report}\n{spy_report}"
+        
+        return {
+            "status": final_status,
+            "msg": full_msg,
+            "timestamp": final_timestamp,
+            "id_candidates": id_candidates,
+            "metadata": meta_state,
+            "signer": signer,
+            "deep_embed": deep_embed
+        }
+
+    def _get_verify_cache(self):
+        if not self.use_verify_cache:
+            return None
+        if self._verify_cache is None:
+            self._verify_cache = VerifyCache(os.path.join(self.data_dir, os.path.basename(VERIFY_CACHE_FILE)))
+        return self._verify_cache
+
+    def verify_signatures(self, metadatas, workers=None):
+        # Signature check only (no pixel hash) for many LookeyData objects; returns the signer fingerprint or None for each.
+        # Checks are grouped by signer so each key is parsed once, and the groups run on a thread pool.
+        results = [None] * len(metadatas)
+        by_signer = {}
+        for i, metadata in enumerate(metadatas):
+            try:
+                message = json.dumps(metadata["payload"], sort_keys=True).encode("utf-8")
+                job = (i, base64.b64decode(metadata["signature"]), message)
+                by_signer.setdefault(base64.b64decode(metadata["signer_pubkey"]), []).append(job)
+            except Exception:
+                continue
+
+        def check(chunk):
+            pem_bytes, jobs = chunk
+            return [(i, self.key_cache.verify(pem_bytes, signature, message)) for i, signature, message in jobs]
+
+        chunks = [(pem_bytes, jobs[k:k + SIGNATURE_CHUNK]) for pem_bytes, jobs in by_signer.items() for k in range(0, len(jobs), SIGNATURE_CHUNK)]
+        with ThreadPoolExecutor(max_workers=min(resolve_workers(workers), max(1, len(chunks)))) as pool:
+            for checked in pool.map(check, chunks):
+                for i, fingerprint in checked:
+                    results[i] = fingerprint
+        return results
+
+    def worker_options(self):
+        return {
+            "data_dir": self.data_dir,
+            "hash_version": self.hash_version,
+            "predict_strategy": self.predict_strategy,
+            "parallel_strategies": self.parallel_strategies,
+            "max_memory_mb": self.max_memory_mb,
+            "verify_cache": self.use_verify_cache,
+            "watermark_prefilter": self.watermark_prefilter
+        }
+
+    def apply_options(self, options, workers=None):
+        self.use_hash_version(options["hash_version"], workers)
+        self.predict_strategy = options["predict_strategy"]
+        self.parallel_strategies = options["parallel_strategies"]
+        self.max_memory_mb = options["max_memory_mb"]
+        self.use_verify_cache = options["verify_cache"]
+        self.watermark_prefilter = options["watermark_prefilter"]
+
+    def use_hash_version(self, version, workers=None):
+        self.hash_version = version
+        self.hash_workers = resolve_workers(workers) if HASH_SCHEMES[version] == "tree" else 1
+
+    def _hasher(self):
+        return PixelHasher(self.hash_version, self.hash_workers)
+
+    def sign_invisible(self, image_path, session=None):
+        if not self.is_setup():
+            return SignResult(False, "Setup required.", image_path)
 
-            full_msg = f"{meta_report}\n{spy_report}"
+        timings = {}
+        try:
+            if session is None:
+                with self.signing_session() as session:
+                    return self.sign_invisible(image_path, session)
+
+            encoder = self._make_encoder(session)
+
+            if self.max_memory_mb:
+                # Refuse before decoding anything rather than get the worker OOM-killed halfway through.
+                # The encoder is built first so the baseline already includes the watermark libraries.
+                with Image.open(image_path) as img:
+                    needed = current_rss_mb() + EmbedWorkspace.estimate_mb(*img.size)
+                if needed > self.max_memory_mb:
+                    return SignResult(False, f"Needs about {needed:.0f} MB, over the {self.max_memory_mb} MB memory budget.", image_path, timings=timings)
+
+            with self._span("decode", timings):
+                bgr = self._load_embed_source(image_path)
+            if bgr is None: return SignResult(False, "Could not read image.", image_path, timings=timings)
+            workspace = EmbedWorkspace(bgr.shape) if self.max_memory_mb else None
+
+            name_only = os.path.splitext(os.path.basename(image_path))[0]
+            output_path = marked_output_path(image_path)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+            # Checked once here so every embed path (plain, --max-memory, sequences) treats small images alike.
+            too_small = bgr.shape[0] * bgr.shape[1] < MIN_EMBED_PIXELS
+            final_bgr, used_strategy, attempts = None, None, 0
+            if not too_small:
+                with self._span("texture", timings):
+                    report = self.analyze_texture(bgr)
+                strategies = report.strategies()
+                bucket = self.planner.bucket(report.avg_std, report.void_ratio, report.safe_for_noise)
+                final_bgr, used_strategy, attempts = self._run_strategies(bgr, encoder, strategies, bucket, timings, workspace)
+            spy_success = final_bgr is not None
+
+            out_bgr = final_bgr if spy_success else bgr
+            # Only the output buffer is still needed; drop the source and attempt buffers before the PNG encode allocates.
+            bgr = final_bgr = workspace = None
+
+            with self._span("hash", timings):
+                pixel_hash = self._hasher().hash_bgr(out_bgr)
+            with self._span("sign", timings):
+                json_str = session.build_metadata(pixel_hash, self.hash_version)
+            with self._span("png_write", timings):
+                # One encode straight from the BGR buffer; the signature chunk is spliced in as the file is written.
+                ok, encoded_png = cv2.imencode(".png", out_bgr, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+                out_bgr = None
+                if not ok: return SignResult(False, "Could not encode PNG.", image_path, timings=timings)
+                with open(output_path, "wb") as f:
+                    f.writelines(png_text_chunks(memoryview(encoded_png).cast("B"), "LookeyData", json_str))
             
-            return {
-                "status": final_status,
-                "msg": full_msg,
-                "timestamp": final_timestamp
-            }
+            if spy_success:
+                msg = f"Saved to: Lookey_Marked/{name_only}.png (Deep Embed Active)"
+                result = SignResult(True, msg, image_path, output_path, "deep", used_strategy, attempts, timings)
+            elif too_small:
+                msg = f"Image too small for Deep Embed (under 256x256 pixels). Applied Standard Signature to Lookey_Marked/{name_only}.png"
+                result = SignResult(True, msg, image_path, output_path, "standard", None, attempts, timings)
+            else:
+                msg = f"Image too fragile for Deep Embed. Applied Standard Signature to Lookey_Marked/{name_only}.png"
+                result = SignResult(True, msg, image_path, output_path, "standard", None, attempts, timings)
+            result.peak_rss_mb = peak_rss_mb()
+            return result
 
         except Exception as e:
-            return {"status": "INVALID", "msg": f"Verification Error: {str(e)}"}
-
-    def _get_image_pixel_hash(self, path):
-        img = Image.open(path).convert("RGB")
-        return hashlib.sha256(img.tobytes()).hexdigest()
-
-    def _extract_exif_metadata(self, path):
-        try:
-            exif_dict = piexif.load(path)
-            raw = exif_dict["Exif"].get(piexif.ExifIFD.UserComment)
-            if raw:
-                clean_raw = raw.decode('utf-8', errors='ignore')
-                start = clean_raw.find('{')
-                end = clean_raw.rfind('}') + 1
-                if start != -1 and end != -1:
-                    return json.loads(clean_raw[start:end])
-        except:
-            pass
-        return None
+            return SignResult(False, f"Deep Embed Error: {str(e)}", image_path, timings=timings)
     
-    def sign_invisible(self, image_path):
+    def sign_sequence(self, source, workers=1, duration_ms=SEQUENCE_FRAME_MS, session=None):
+        # Deep Embeds every frame of an animation (or a folder of frames) into one APNG whose single
+        # signature covers all frames. Frames stream through a bounded pool window and their PNG data is
+        # spooled to a temp file, so memory holds a few frames however long the sequence is.
         if not self.is_setup():
-            return False, "Setup required."
+            return SignResult(False, "Setup required.", source)
 
+        timings = {}
         try:
-            bgr = cv2.imread(image_path)
-            if bgr is None: return False, "Could not read image."
-            
-            h, w = bgr.shape[:2]
-            new_h = h if h % 2 == 0 else h - 1
-            new_w = w if w % 2 == 0 else w - 1
-            if new_h != h or new_w != w:
-                bgr = bgr[:new_h, :new_w]
-
-            key_hash = hashlib.sha256(self.get_my_public_key_string().encode()).hexdigest()[:4]
-            time_code = self._get_timestamp_code()
-            payload = f"{key_hash}{time_code}"
-            
-            encoder = WatermarkEncoder()
-            encoder.set_watermark('bytes', payload.encode('utf-8'))
+            if session is None:
+                with self.signing_session() as session:
+                    return self.sign_sequence(source, workers, duration_ms, session)
+
+            source = os.path.normpath(source)
+            name_only = os.path.splitext(os.path.basename(source))[0]
+            output_path = marked_output_path(source)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            loop = 0
+            if not os.path.isdir(source):
+                # A GIF without a loop extension plays once; acTL counts plays the same way (0 = forever).
+                with Image.open(source) as img:
+                    loop = img.info.get("loop", 1)
+
+            encoder = self._make_encoder(session)
+            scene = {"ref": None, "strategies": [], "last": None, "shape": None}
+            durations = deque()
+
+            def jobs():
+                for index, (bgr, duration) in enumerate(iter_sequence_frames(source, duration_ms)):
+                    bgr = bgr[:bgr.shape[0] // 2 * 2, :bgr.shape[1] // 2 * 2]
+                    if scene["shape"] is None:
+                        scene["shape"] = bgr.shape
+                    elif bgr.shape != scene["shape"]:
+                        raise ValueError(f"Frame {index + 1} is {bgr.shape[1]}x{bgr.shape[0]}, expected {scene['shape'][1]}x{scene['shape'][0]}")
+
+                    # Similar frames reuse the texture analysis of the frame that opened their scene.
+                    thumb = cv2.resize(cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY), (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+                    if scene["ref"] is None or np.abs(thumb - scene["ref"]).mean() > SEQUENCE_SCENE_DELTA:
+                        with self._span("texture", timings):
+                            scene["strategies"] = self.analyze_texture(bgr).strategies()
+                        scene["ref"] = thumb
+
+                    # Start from the strategy that worked on the latest finished frame.
+                    order = list(scene["strategies"])
+                    if scene["last"] in order:
+                        order.remove(scene["last"])
+                        order.insert(0, scene["last"])
+                    durations.append(duration)
+                    yield bgr, encoder, order
+
+            if workers <= 1:
+                frames = (self._mark_frame(*job) for job in jobs())
+            else:
+                cv_threads = max(1, (os.cpu_count() or 1) // workers)
+                frames = _pool_map(_sequence_frame_job, jobs(), workers, _init_batch_worker, (cv_threads, self.worker_options()))
+
+            ihdr = root = None
+            count = marked = attempts = seq = 0
+            with tempfile.TemporaryFile(dir=os.path.dirname(output_path)) as spool:
+                for frame in frames:
+                    if ihdr is None:
+                        ihdr = frame["ihdr"]
+                        width, height = struct.unpack(">II", ihdr[:8])
+                        root = PixelHasher.sequence_root(width, height)
+                    delay = min(durations.popleft(), 65535)
+                    spool.write(png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", seq, width, height, 0, 0, delay, 1000, 0, 0)))
+                    seq += 1
+                    for data in frame["idat"]:
+                        if count == 0:
+                            spool.write(png_chunk(b"IDAT", data))
+                        else:
+                            spool.write(png_chunk(b"fdAT", struct.pack(">I", seq) + data))
+                            seq += 1
+
+                    root.update(frame["digest"])
+                    count += 1
+                    attempts += frame["attempts"]
+                    if frame["strategy"] is not None:
+                        marked += 1
+                        scene["last"] = frame["strategy"]
+                    for stage, elapsed in frame["timings"].items():
+                        timings[stage] = timings.get(stage, 0.0) + elapsed
+
+                if not count:
+                    return SignResult(False, "No frames found.", source, timings=timings)
+
+                with self._span("sign", timings):
+                    json_str = session.build_metadata(root.hexdigest(), SEQUENCE_HASH_VERSION)
+                with self._span("png_write", timings):
+                    spool.seek(0)
+                    with open(output_path, "wb") as f:
+                        f.write(PNG_SIGNATURE + png_chunk(b"IHDR", ihdr) + png_chunk(b"acTL", struct.pack(">II", count, loop)))
+                        f.write(png_chunk(b"tEXt", b"LookeyData\x00" + json_str.encode("latin-1")))
+                        shutil.copyfileobj(spool, f)
+                        f.write(png_chunk(b"IEND", b""))
+
+            msg = f"Saved to: Lookey_Marked/{name_only}.png ({marked}/{count} frames Deep Embedded)"
+            result = SignResult(True, msg, source, output_path, "deep" if marked else "standard", scene["last"], attempts, timings)
+            result.peak_rss_mb = peak_rss_mb()
+            return result
 
-            parent_dir = os.path.dirname(image_path)
-            filename = os.path.basename(image_path)
-            name_only = os.path.splitext(filename)[0]
-            save_dir = os.path.join(parent_dir, "Lookey_Marked")
-            os.makedirs(save_dir, exist_ok=True)
-            output_path = os.path.join(save_dir, name_only + ".png")
+        except Exception as e:
+            return SignResult(False, f"Sequence Error: {str(e)}", source, timings=timings)
+
+    def _mark_frame(self, bgr, encoder, strategies):
+        # One sequence frame: the first strategy that survives, then PNG-encoded and hashed where it was marked.
+        timings = {}
+        encoded, used, attempts = None, None, 0
+        if bgr.shape[0] * bgr.shape[1] >= MIN_EMBED_PIXELS:
+            for strategy in strategies:
+                attempts += 1
+                encoded = self._attempt_strategy(bgr, encoder, *strategy, timings)
+                if encoded is not None:
+                    used = strategy
+                    break
 
-            gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-            
-            (mean, std_dev) = cv2.meanStdDev(bgr)
-            avg_std = sum(std_dev) / len(std_dev)
-            
-            void_pixels = np.sum((gray < 10) | (gray > 245))
-            void_ratio = void_pixels / gray.size
-            
-            strategies = []
-            
-            strategies.append((0, 36))
-            strategies.append((0, 60))
-            
-            if self._is_safe_for_noise(bgr):
-                strategies.append((2, 50))
-                
-                (mean, global_std) = cv2.meanStdDev(bgr)
-                if sum(global_std)/3 < 20:
-                    strategies.append((4, 90))
-            
-            spy_success = False
-            final_bgr = None
+        out = encoded if encoded is not None else bgr
+        with self._span("hash", timings):
+            digest = bytes.fromhex(PixelHasher(LOOKEY_VERSION).hash_bgr(out))
+        with self._span("png_write", timings):
+            ok, png = cv2.imencode(".png", out, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+            if not ok:
+                raise ValueError("Could not encode frame")
+            chunks = list(iter_png_chunks(png.tobytes()))
+        return {
+            "ihdr": next(body for ctype, body in chunks if ctype == b"IHDR"),
+            "idat": [body for ctype, body in chunks if ctype == b"IDAT"],
+            "digest": digest,
+            "strategy": used,
+            "attempts": attempts,
+            "timings": timings
+        }
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    @contextmanager
+    def _span(self, stage, timings, **info):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+            for hook in self.hooks:
+                hook(stage, elapsed, info)
+
+    def _make_encoder(self, session):
+        key_hash = session.identity_hash
+        time_code = self._get_timestamp_code()
+        payload = f"{key_hash}{time_code}"
+        
+        encoder = imwatermark.WatermarkEncoder()
+        encoder.set_watermark('bytes', payload.encode('utf-8'))
+        return encoder
 
-            for noise_level, strength in strategies:
-                current_bgr = bgr.copy()
-                
-                if noise_level > 0:
-                    bgr_float = current_bgr.astype(np.float32)
-                    noise_map = np.random.normal(0, noise_level, (new_h, new_w)).astype(np.float32)
-                    noise_3ch = cv2.merge([noise_map, noise_map, noise_map])
-                    bgr_noisy = cv2.add(bgr_float, noise_3ch)
-                    np.clip(bgr_noisy, 0, 255, out=bgr_noisy)
-                    current_bgr = bgr_noisy.astype(np.uint8)
-
-                bgr_encoded = encoder.encode(current_bgr, 'dwtDct', scales=[0, strength, 0])
-
-                temp_jpg = output_path + ".temp_check.jpg"
-                cv2.imwrite(temp_jpg, bgr_encoded, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-                
-                scan_result = self._verify_invisible_scan(temp_jpg)
-                try: os.remove(temp_jpg)
-                except: pass
+    def _attempt_strategy(self, bgr, encoder, noise_level, strength, timings=None, workspace=None):
+        timings = {} if timings is None else timings
+        if workspace is not None:
+            return self._attempt_budgeted(workspace, bgr, encoder, noise_level, strength, timings)
+        bgr_encoded = self._apply_strategy(bgr, encoder, noise_level, strength, timings)
 
-                if scan_result and scan_result[0] == self.user_name:
-                    final_bgr = bgr_encoded
-                    spy_success = True
-                    break
-            
-            if spy_success:
-                rgb_encoded = cv2.cvtColor(final_bgr, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(rgb_encoded)
-            else:
-                rgb_clean = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(rgb_clean)
+        with self._span("robustness_check", timings, strategy=(noise_level, strength)):
+            scan_result = self._scan_watermark(self._jpeg_round_trip(bgr_encoded, 95))
 
-            pil_img.save(output_path, "PNG")
+        if scan_result and scan_result["name"] == self.user_name:
+            return bgr_encoded
+        return None
 
-            pixel_hash = self._get_image_pixel_hash(output_path)
-            timestamp = datetime.datetime.utcnow().isoformat()
-            std_payload = { "pixel_hash": pixel_hash, "timestamp": timestamp, "author": self.user_name }
-            std_json = json.dumps(std_payload, sort_keys=True)
-            
-            with open(KEY_FILE, "rb") as f:
-                private_key = serialization.load_pem_private_key(f.read(), password=None)
-            signature = private_key.sign(std_json.encode('utf-8'))
-            with open(PUB_FILE, "rb") as f:
-                my_pub_key_bytes = f.read()
-
-            meta_dict = {
-                "lookey_version": "1.0",
-                "payload": std_payload,
-                "signature": base64.b64encode(signature).decode('utf-8'),
-                "signer_pubkey": base64.b64encode(my_pub_key_bytes).decode('utf-8')
-            }
-            
-            img_obj = Image.open(output_path)
-            self._inject_png(output_path, img_obj, json.dumps(meta_dict))
-            
-            if spy_success:
-                return True, f"Saved to: Lookey_Marked/{name_only}.png (Deep Embed Active)"
-            else:
-                return True, f"Image too fragile for Deep Embed. Applied Standard Signature to Lookey_Marked/{name_only}.png"
+    def _apply_strategy(self, bgr, encoder, noise_level, strength, timings):
+        # Noise and dwtDct encode for one strategy, without the survival check.
+        current_bgr = bgr.copy()
+        
+        if noise_level > 0:
+            with self._span("noise", timings, strategy=(noise_level, strength)):
+                h, w = current_bgr.shape[:2]
+                bgr_float = current_bgr.astype(np.float32)
+                noise_map = np.random.normal(0, noise_level, (h, w)).astype(np.float32)
+                noise_3ch = cv2.merge([noise_map, noise_map, noise_map])
+                bgr_noisy = cv2.add(bgr_float, noise_3ch)
+                np.clip(bgr_noisy, 0, 255, out=bgr_noisy)
+                current_bgr = bgr_noisy.astype(np.uint8)
+
+        with self._span("encode", timings, strategy=(noise_level, strength)):
+            return encoder.encode(current_bgr, 'dwtDct', scales=[0, strength, 0])
+
+    def _attempt_budgeted(self, workspace, bgr, encoder, noise_level, strength, timings):
+        # Budgeted variant: writes into the workspace buffers and frees the JPEG round trip before resolving.
+        current_bgr = bgr
+        if noise_level > 0:
+            with self._span("noise", timings, strategy=(noise_level, strength)):
+                current_bgr = workspace.add_noise(bgr, noise_level)
+
+        with self._span("encode", timings, strategy=(noise_level, strength)):
+            bgr_encoded = workspace.encode(current_bgr, encoder, strength)
+
+        with self._span("robustness_check", timings, strategy=(noise_level, strength)):
+            raw_bytes = workspace.decode(self._jpeg_round_trip(bgr_encoded, 95))
+            scan_result = self._resolve_watermark(raw_bytes) if raw_bytes else None
+
+        if scan_result and scan_result["name"] == self.user_name:
+            return bgr_encoded
+        return None
+
+    def _run_strategies(self, bgr, encoder, strategies, bucket, timings, workspace=None):
+        # Parallel attempts each need their own buffers, so a memory budget forces the serial path.
+        if self.parallel_strategies and len(strategies) > 1 and workspace is None:
+            # Every candidate is evaluated, so the weakest strategy that survives wins.
+            attempt_timings = [{} for _ in strategies]
+            with ThreadPoolExecutor(max_workers=len(strategies)) as pool:
+                results = list(pool.map(lambda st, t: self._attempt_strategy(bgr, encoder, *st, t), strategies, attempt_timings))
+            for attempt in attempt_timings:
+                for stage, elapsed in attempt.items():
+                    timings[stage] = timings.get(stage, 0.0) + elapsed
+            for strategy, encoded in zip(strategies, results):
+                if encoded is not None:
+                    self.planner.record(bucket, strategy)
+                    return encoded, strategy, len(strategies)
+            self.planner.record(bucket, None)
+            return None, None, len(strategies)
+
+        order = strategies
+        if self.predict_strategy and random.random() >= STRATEGY_EXPLORE_RATE:
+            order = self.planner.plan(bucket, strategies)
+        
+        # Only runs in the unbiased order teach the planner; predicted runs would reinforce themselves.
+        learn = order == strategies
+        attempts = 0
+        for strategy in order:
+            attempts += 1
+            encoded = self._attempt_strategy(bgr, encoder, *strategy, timings, workspace)
+            if encoded is not None:
+                if learn: self.planner.record(bucket, strategy)
+                return encoded, strategy, attempts
+
+        if learn: self.planner.record(bucket, None)
+        return None, None, attempts
+
+    def open_manifest(self):
+        return BatchManifest(
+            os.path.join(self.data_dir, os.path.basename(MANIFEST_DB_FILE)),
+            os.path.join(self.data_dir, os.path.basename(MANIFEST_FILE))
+        )
+
+    def batch_sign_invisible(self, paths, workers=1, manifest=None):
+        if not self.is_setup():
+            for path in paths:
+                yield SignResult(False, "Setup required.", path)
+            return
+
+        claimed = {}
+        digests = {}
+        duplicates = {}
+
+        def unclaimed():
+            # photo.jpg and photo.png share Lookey_Marked/photo.png; only the first one seen may write it.
+            for path in paths:
+                output_path = os.path.abspath(marked_output_path(path))
+                owner = claimed.setdefault(output_path, path)
+                if owner != path:
+                    yield SignResult(False, f"Output clash: {os.path.basename(owner)} already writes Lookey_Marked/{os.path.basename(output_path)}", path)
+                    continue
+                yield path
+
+        if manifest is None:
+            yield from self._embed_many(unclaimed(), workers)
+            return
+
+        signer = self._identity_hash(self.get_my_public_key_string())
+
+        def todo():
+            # Reused files and errors are final here and pass through in order, so a rerun over an
+            # unchanged tree streams its results instead of holding them until the next embed.
+            for item in unclaimed():
+                if isinstance(item, SignResult):
+                    yield item
+                    continue
+                try:
+                    digest = manifest.digest(item)
+                except OSError as e:
+                    yield SignResult(False, f"Could not read file: {e}", item)
+                    continue
+                if digest in duplicates:
+                    duplicates[digest].append(item)
+                    continue
+                reused = manifest.reuse(item, digest, signer, self.hash_version)
+                if reused:
+                    yield reused
+                    continue
+                digests[item] = digest
+                duplicates[digest] = []
+                yield item
 
-        except Exception as e:
-            return False, f"Deep Embed Error: {str(e)}"
-    
-    def _verify_invisible_scan(self, image_path):
         try:
-            bgr = cv2.imread(image_path)
-            if bgr is None: return None
+            for result in self._embed_many(todo(), workers):
+                digest = digests.pop(result.source_path, None)
+                if digest is None:
+                    yield result
+                    continue
+                manifest.record(digest, result, signer, self.hash_version)
+                yield result
+                for path in duplicates.pop(digest):
+                    yield manifest.reuse(path, digest, signer, self.hash_version) or SignResult(False, result.msg, path)
+        finally:
+            manifest.close()
+
+    def _embed_many(self, items, workers):
+        # Items are paths to embed, or SignResults that are already final and are passed through in order.
+        if workers <= 1:
+            with self.signing_session() as session:
+                for item in items:
+                    yield item if isinstance(item, SignResult) else session.deep_embed(item)
+            return
 
-            decoder = WatermarkDecoder('bytes', 64) 
-            raw_bytes = decoder.decode(bgr, 'dwtDct')
-            
-            candidates = {}
-            candidates[self.user_name] = self.get_my_public_key_string()
-            for data in self.contacts.values():
-                candidates[data['name']] = data['key']
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        yield from _pool_map(_batch_embed_job, items, workers, _init_batch_worker, (cv_threads, self.worker_options()),
+                             done=lambda item: isinstance(item, SignResult),
+                             on_error=lambda path, e: SignResult(False, _worker_lost(e), path))
 
-            best_match_name = None
-            found_timestamp = "Unknown"
-            lowest_error = 999
+    def batch_verify(self, paths, workers=1):
+        if workers <= 1:
+            for path in paths:
+                yield self._verify_record(path)
+            return
 
-            for name, pubkey in candidates.items():
-                expected_hash_str = hashlib.sha256(pubkey.encode()).hexdigest()[:4]
-                
-                found_hash_bytes = raw_bytes[:4]
-                expected_hash_bytes = expected_hash_str.encode('utf-8')
-                
-                error_count = self._hamming_distance(found_hash_bytes, expected_hash_bytes)
-                
-                if error_count < 6: 
-                    if error_count < lowest_error:
-                        lowest_error = error_count
-                        best_match_name = name
-                        
-                        try:
-                            time_bytes = raw_bytes[4:8] 
-                            time_str = time_bytes.decode('utf-8', errors='ignore')
-                            found_timestamp = self._decode_timestamp_code(time_str)
-                        except:
-                            found_timestamp = "Corrupted Time"
-
-            if best_match_name:
-                return (best_match_name, found_timestamp)
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        yield from _pool_map(_verify_job, paths, workers, _init_verify_worker, (cv_threads, self.data_dir, self.use_verify_cache, self.watermark_prefilter),
+                             on_error=lambda path, e: self._verify_error_record(path, _worker_lost(e)))
+
+    def _verify_record(self, image_path, data=None):
+        started = time.perf_counter()
+        res = self.verify_bytes(data) if data is not None else self.verify_image(image_path)
+        return {
+            "path": image_path,
+            "status": res["status"],
+            "metadata": res.get("metadata"),
+            "signer": res.get("signer"),
+            "deep_embed": res.get("deep_embed"),
+            "timestamp": res.get("timestamp"),
+            "msg": res["msg"],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "timings_ms": {stage: round(t * 1000, 2) for stage, t in res.get("timings", {}).items()}
+        }
+
+    def _verify_error_record(self, image_path, msg):
+        return {
+            "path": image_path, "status": "INVALID", "metadata": None, "signer": None, "deep_embed": None, "timestamp": None,
+            "msg": f"Verification Error: {msg}", "elapsed_ms": 0.0, "timings_ms": {}
+        }
+
+    def _verify_invisible_scan(self, image_path):
+        bgr = cv2.imread(image_path)
+        if bgr is None: return None
+        return self._scan_watermark(bgr)
+
+    def _jpeg_round_trip(self, bgr, quality):
+        ok, buf = cv2.imencode(".jpg", bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not ok: return None
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    def _scan_watermark(self, bgr):
+        raw_bytes = self._decode_watermark(bgr)
+        return self._resolve_watermark(raw_bytes) if raw_bytes else None
+
+    def _watermark_scores(self, bgr, length=64, scale=36, block_rows=None):
+        # The decoder's per-block bit scores, vectorized: U channel, Haar level, largest non-DC magnitude of each
+        # 4x4 block modulo the scale (same rule and tie-breaking as EmbedMaxDct.infer_dct_matrix). Returns the
+        # block count and score sum per bit position, over every block row or over an evenly spread sample of them.
+        h, w = bgr.shape[:2]
+        nby, nbx = h // 8, w // 8
+        if block_rows is None:
+            spans = [np.arange(y, min(y + EMBED_STRIP_ROWS // 8, nby)) for y in range(0, nby, EMBED_STRIP_ROWS // 8)]
+        else:
+            spans = [np.unique(np.linspace(0, nby - 1, min(nby, block_rows)).astype(int))]
+
+        n = np.zeros(length)
+        ones = np.zeros(length)
+        for by in spans:
+            rows = (by[:, None] * 8 + np.arange(8)).ravel()
+            yuv = cv2.cvtColor(np.ascontiguousarray(bgr[rows, :nbx * 8]), cv2.COLOR_BGR2YUV)
+            ca1, _ = pywt.dwt2(yuv[:, :, 1], 'haar')
+            blocks = np.abs(ca1.reshape(len(by), 4, nbx, 4).transpose(0, 2, 1, 3).reshape(len(by), nbx, 16)[..., 1:])
+            peak = np.take_along_axis(blocks, blocks.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+            bits = ((by[:, None] * nbx + np.arange(nbx)) % length).ravel()
+            n += np.bincount(bits, minlength=length)
+            ones += np.bincount(bits, weights=((peak % scale) > 0.5 * scale).ravel(), minlength=length)
+        return n, ones
+
+    def _watermark_presence(self, bgr, block_rows=PRESENCE_BLOCK_ROWS, length=64, scale=36):
+        # Opt-in presence test on a sample of block rows. Bit positions are interleaved across the image, so without
+        # a mark every position sees the same score rate; a mark makes them disagree. Returns a chi-square homogeneity
+        # z-score (~0 unmarked). Weak marks (strength 50+ read at scale 36, after JPEG) can score below PRESENCE_MIN_Z.
+        h, w = bgr.shape[:2]
+        if h * w < MIN_EMBED_PIXELS:
+            return 0.0
+        n, ones = self._watermark_scores(bgr, length, scale, block_rows)
+        used = n > 0
+        n, ones = n[used], ones[used]
+        p = ones.sum() / n.sum()
+        if p <= 0 or p >= 1 or len(n) < 2:
+            return 0.0
+        chi2 = ((ones - n * p) ** 2 / (n * p * (1 - p))).sum()
+        df = len(n) - 1
+        return float((chi2 - df) / np.sqrt(2 * df))
+
+    def _decode_watermark(self, bgr, length=64, scale=36):
+        # Bit-identical to WatermarkDecoder('bytes', 64).decode(bgr, 'dwtDct'), without its per-block Python loop.
+        if bgr is None or bgr.shape[0] * bgr.shape[1] < MIN_EMBED_PIXELS:
+            return None
+        n, ones = self._watermark_scores(bgr, length, scale)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            bits = ones / n * 255 > 127
+        return np.packbits(bits).tobytes()
+
+    def _resolve_watermark(self, raw_bytes):
+        try:
+            found_id = raw_bytes[:4]
+            time_str = raw_bytes[4:8].decode('utf-8', errors='ignore')
+            found_timestamp = self._decode_timestamp_code(time_str)
+
+            matches = self._match_identity(found_id)
+            if matches:
+                return {
+                    "name": matches[0][0],
+                    "timestamp": found_timestamp,
+                    "raw_id": found_id.hex(),
+                    "candidates": matches
+                }
                 
-            try:
-                time_bytes = raw_bytes[4:8] 
-                time_str = time_bytes.decode('utf-8', errors='ignore')
-                orphan_timestamp = self._decode_timestamp_code(time_str)
+            if found_timestamp != "Corrupted Time":
+                raw_id_hash = found_id.hex() 
                 
-                if orphan_timestamp != "Corrupted Time":
-                    raw_id_hash = raw_bytes[:4].hex() 
-                    
-                    if raw_id_hash == "ffffffff" or raw_id_hash == "00000000":
-                        return None
+                if raw_id_hash == "ffffffff" or raw_id_hash == "00000000":
+                    return None
 
-                    return ("UNKNOWN", orphan_timestamp, raw_id_hash)
-            except:
-                pass
+                return {"name": None, "timestamp": found_timestamp, "raw_id": raw_id_hash, "candidates": []}
 
         except Exception as e:
             pass
         return None
+
+    def _identity_hash(self, pubkey_b64):
+        return identity_hash(pubkey_b64)
+
+    def _invalidate_id_index(self):
+        self._id_index = None
+
+    def _get_id_index(self):
+        if self._id_index is None:
+            names = []
+            prefixes = []
+            my_key = self.get_my_public_key_string()
+            if self.user_name and my_key:
+                names.append(self.user_name)
+                prefixes.append(self._identity_hash(my_key).encode('utf-8'))
+            for name, id_prefix in self.contacts.id_prefixes():
+                names.append(name)
+                prefixes.append(id_prefix.encode('utf-8'))
+
+            matrix = np.frombuffer(b"".join(prefixes), dtype=np.uint8).reshape(-1, 4)
+            self._id_index = (names, matrix)
+        return self._id_index
+
+    def _match_identity(self, found_id, max_errors=6):
+        names, matrix = self._get_id_index()
+        if len(found_id) != 4 or len(names) == 0:
+            return []
+
+        found = np.frombuffer(found_id, dtype=np.uint8)
+        errors = np.unpackbits(np.bitwise_xor(matrix, found), axis=1).sum(axis=1)
         
-    def _is_safe_for_noise(self, bgr):
-    
-        h, w = bgr.shape[:2]
-        rows, cols = 4, 4
-        step_h, step_w = h // rows, w // cols
+        matches = []
+        seen = set()
+        for i in np.argsort(errors, kind="stable"):
+            if errors[i] >= max_errors:
+                break
+            if names[i] not in seen:
+                seen.add(names[i])
+                matches.append((names[i], int(errors[i])))
+        return matches
         
-        risky_sectors = 0
-        total_sectors = rows * cols
+    def _load_embed_source(self, image_path):
+        bgr = cv2.imread(image_path)
+        if bgr is None: return None
         
-        for r in range(rows):
-            for c in range(cols):
-                y1, y2 = r * step_h, (r + 1) * step_h
-                x1, x2 = c * step_w, (c + 1) * step_w
-                
-                sector = bgr[y1:y2, x1:x2]
-                gray_sec = cv2.cvtColor(sector, cv2.COLOR_BGR2GRAY)
-                
-                (mean, std_dev) = cv2.meanStdDev(sector)
-                avg_std = sum(std_dev) / len(std_dev)
-                
-                avg_bright = np.mean(gray_sec)
+        h, w = bgr.shape[:2]
+        new_h = h if h % 2 == 0 else h - 1
+        new_w = w if w % 2 == 0 else w - 1
+        if new_h != h or new_w != w:
+            bgr = bgr[:new_h, :new_w]
+        return bgr
+
+    def analyze_texture(self, bgr, max_side=None, rows=4, cols=4):
+        h, w = bgr.shape[:2]
+        proxy_scale = 1.0
+        if max_side and max(h, w) > max_side:
+            proxy_scale = max_side / max(h, w)
+            bgr = cv2.resize(bgr, (max(1, round(w * proxy_scale)), max(1, round(h * proxy_scale))), interpolation=cv2.INTER_AREA)
+            h, w = bgr.shape[:2]
+
+        step_h, step_w = h // rows, w // cols
+        col_starts = [c * step_w for c in range(cols)]
+        if cols * step_w < w:
+            col_starts.append(cols * step_w)
+
+        total_sum = np.zeros(3)
+        total_sq = np.zeros(3)
+        void_pixels = 0
+        sector_sum = np.zeros((rows, cols, 3))
+        sector_sq = np.zeros((rows, cols, 3))
+        sector_gray = np.zeros((rows, cols))
+
+        # Sector rows first, then any leftover rows at the bottom that only count towards the global stats.
+        bands = [(r * step_h, (r + 1) * step_h, r) for r in range(rows) if step_h > 0]
+        bands.append((rows * step_h, h, None))
+        strip_rows = max(1, TEXTURE_STRIP_PIXELS // max(1, w))
+
+        for band_start, band_end, r in bands:
+            for y in range(band_start, band_end, strip_rows):
+                strip = bgr[y:min(y + strip_rows, band_end)]
+                col_sum = strip.sum(axis=0, dtype=np.uint64)
+                col_sq = np.square(strip, dtype=np.uint16).sum(axis=0, dtype=np.uint64)
+                gray = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
                 
-                if avg_bright < 60 and avg_std < 20:
-                    risky_sectors += 1
-        
-        if risky_sectors > (total_sectors * 0.25):
-            return False
-            
-        return True
-        
-    def _hamming_distance(self, s1, s2):
-        if len(s1) != len(s2): return 999
-        diff = 0
-        for b1, b2 in zip(s1, s2):
-            diff += bin(b1 ^ b2).count('1')
-        return diff
+                total_sum += col_sum.sum(axis=0)
+                total_sq += col_sq.sum(axis=0)
+                void_pixels += np.count_nonzero((gray < 10) | (gray > 245))
+
+                if r is not None and step_w > 0:
+                    sector_sum[r] += np.add.reduceat(col_sum, col_starts, axis=0)[:cols]
+                    sector_sq[r] += np.add.reduceat(col_sq, col_starts, axis=0)[:cols]
+                    sector_gray[r] += np.add.reduceat(gray.sum(axis=0, dtype=np.uint64), col_starts)[:cols]
+
+        pixels = h * w
+        channel_mean = total_sum / pixels
+        channel_std = np.sqrt(np.maximum(total_sq / pixels - channel_mean ** 2, 0))
+
+        risky_sectors = 0
+        sector_pixels = step_h * step_w
+        if sector_pixels > 0:
+            sector_mean = sector_sum / sector_pixels
+            sector_std = np.sqrt(np.maximum(sector_sq / sector_pixels - sector_mean ** 2, 0)).mean(axis=2)
+            sector_bright = sector_gray / sector_pixels
+            risky_sectors = int(np.count_nonzero((sector_bright < 60) & (sector_std < 20)))
+
+        return TextureReport(
+            width=w, height=h,
+            channel_mean=channel_mean.tolist(), channel_std=channel_std.tolist(),
+            void_ratio=float(void_pixels / pixels),
+            risky_sectors=risky_sectors, total_sectors=rows * cols,
+            proxy_scale=proxy_scale
+        )
+
+    def triage_image(self, image_path, max_side=None):
+        bgr = self._load_embed_source(image_path)
+        if bgr is None:
+            return {"path": image_path, "error": "Could not read image."}
+
+        report = self.analyze_texture(bgr, max_side=max_side)
+        strategies = report.strategies()
+        bucket = self.planner.bucket(report.avg_std, report.void_ratio, report.safe_for_noise)
+        predicted, success_rate = self.planner.predict(bucket, strategies)
+
+        if success_rate is None:
+            verdict = report.verdict()
+        elif success_rate >= 0.5:
+            verdict = "likely"
+        else:
+            verdict = "unlikely"
+
+        triage = report.to_dict()
+        triage.update({
+            "path": image_path,
+            "strategies": [f"{noise}/{strength}" for noise, strength in strategies],
+            "bucket": bucket,
+            "predicted_strategy": predicted,
+            "success_rate": success_rate,
+            "deep_embed": verdict
+        })
+        return triage
+
+    def batch_triage(self, paths, workers=1, max_side=None):
+        if workers <= 1:
+            for path in paths:
+                yield self.triage_image(path, max_side)
+            return
+
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        jobs = ((path, max_side) for path in paths)
+        yield from _pool_map(_triage_job, jobs, workers, _init_verify_worker, (cv_threads, self.data_dir),
+                             on_error=lambda job, e: {"path": job[0], "error": _worker_lost(e)})
         
     def _get_timestamp_code(self):
         epoch = datetime.datetime(2025, 1, 1)
@@ -526,14 +1941,394 @@ class LookeyBackend:
 
 
 
+_worker_backend = None
+_worker_session = None
+
+def _init_batch_worker(cv_threads, options):
+    global _worker_backend, _worker_session
+    cv2.setNumThreads(cv_threads)
+    _worker_backend = LookeyBackend(options["data_dir"])
+    _worker_backend.apply_options(options, cv_threads)
+    _worker_session = _worker_backend.signing_session().open()
+    multiprocessing.util.Finalize(_worker_session, _worker_session.close, exitpriority=10)
+
+def _batch_embed_job(image_path):
+    return _worker_session.deep_embed(image_path)
+
+def _init_verify_worker(cv_threads, data_dir=None, verify_cache=True, watermark_prefilter=False):
+    global _worker_backend
+    cv2.setNumThreads(cv_threads)
+    _worker_backend = LookeyBackend(data_dir)
+    _worker_backend.use_verify_cache = verify_cache
+    _worker_backend.watermark_prefilter = watermark_prefilter
+
+def _verify_job(image_path):
+    return _worker_backend._verify_record(image_path)
+
+def _init_server_worker(cv_threads, options):
+    global _worker_backend, _worker_session
+    cv2.setNumThreads(cv_threads)
+    _worker_backend = LookeyBackend(options["data_dir"])
+    _worker_backend.apply_options(options, cv_threads)
+    if _worker_backend.is_setup():
+        _worker_session = _worker_backend.signing_session().open()
+        multiprocessing.util.Finalize(_worker_session, _worker_session.close, exitpriority=10)
+
+def _serve_verify_job(job):
+    image_path, data = job
+    _worker_backend.refresh_contacts()
+    return _worker_backend._verify_record(image_path, data)
+
+def _serve_sign_job(job):
+    image_path, mode = job
+    sign = _worker_backend.sign_image if mode == "standard" else _worker_backend.sign_invisible
+    return sign(image_path, _worker_session).to_dict()
+
+def _sequence_frame_job(job):
+    return _worker_backend._mark_frame(*job)
+
+def _triage_job(job):
+    return _worker_backend.triage_image(*job)
+
+def _pool_map(func, items, workers, initializer=None, initargs=(), done=None, on_error=None):
+    # Keeps a bounded window of jobs in flight and yields results in submission order.
+    # Items for which done(item) is true are already results; they keep their place but skip the pool.
+    # If a worker dies (e.g. OOM-killed), a fresh pool takes the remaining items and every job that was in flight is
+    # re-run alone in a one-worker pool, so only a job that kills its worker by itself becomes on_error(item, exc).
+    # Without on_error the BrokenProcessPool propagates.
+    window = workers * 4
+    pending = deque()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    solo = None
+
+    def submit(item):
+        nonlocal pool
+        try:
+            return pool.submit(func, item)
+        except BrokenProcessPool:
+            if on_error is None:
+                raise
+            pool.shutdown(wait=False)
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+            return pool.submit(func, item)
+
+    def take():
+        nonlocal solo
+        item, future = pending.popleft()
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            if on_error is None:
+                raise
+        if solo is None:
+            solo = ProcessPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs)
+        try:
+            return solo.submit(func, item).result()
+        except BrokenProcessPool as e:
+            solo.shutdown(wait=False)
+            solo = None
+            return on_error(item, e)
+
+    try:
+        for item in items:
+            if done is not None and done(item):
+                future = Future()
+                future.set_result(item)
+            else:
+                future = submit(item)
+            pending.append((item, future))
+            while pending and (len(pending) >= window or pending[0][1].done()):
+                yield take()
+        while pending:
+            yield take()
+    finally:
+        # A caller that stops early (e.g. a cancelled GUI batch) should not wait for queued files.
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        if solo is not None:
+            solo.shutdown(wait=True)
+
+def _worker_lost(exc):
+    return f"Worker process stopped abruptly while processing this file (out of memory?): {exc}"
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+def current_rss_mb():
+    # Resident set right now (Linux); elsewhere the peak so far is the closest cheap figure.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb() or 0
+
+def identity_hash(pubkey_b64):
+    # The 4-character ID carried in the first bytes of a Lookey Mark.
+    return hashlib.sha256(pubkey_b64.encode()).hexdigest()[:4]
+
+def parse_invite_code(code):
+    code = code.strip()
+    if code.startswith("{") or code.startswith("'"):
+        invite = json.loads(code.strip("'").strip('"'))
+    else:
+        invite = json.loads(base64.b64decode(code).decode('utf-8'))
+    name, key = invite.get("name"), invite.get("key")
+    if not name or not key:
+        raise ValueError("Invite Code is missing a name or key")
+    return name, key
+
+def png_with_text(data, keyword, text):
+    return b"".join(png_text_chunks(data, keyword, text))
+
+def png_chunk(ctype, body):
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+def iter_png_chunks(data):
+    pos = 8
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack_from(">I4s", data, pos)
+        yield ctype, data[pos + 8:pos + 8 + length]
+        if ctype == b"IEND":
+            break
+        pos += 12 + length
+
+def png_text_chunks(data, keyword, text):
+    # Yields the chunk list with one tEXt chunk ahead of the image data, dropping any old one for this keyword.
+    # Pieces are slices of data, so a memoryview input is written out without copying the image data.
+    if bytes(data[:8]) != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+    text_chunk = png_chunk(b"tEXt", keyword.encode("latin-1") + b"\x00" + text.encode("latin-1"))
+
+    yield data[:8]
+    pos = 8
+    inserted = False
+    while pos < len(data):
+        length, ctype = struct.unpack_from(">I4s", data, pos)
+        end = pos + 12 + length
+        if ctype in PNG_TEXT_CHUNKS and bytes(data[pos + 8:pos + 8 + length]).split(b"\x00", 1)[0] == keyword.encode("latin-1"):
+            pos = end
+            continue
+        if ctype in (b"IDAT", b"IEND") and not inserted:
+            yield text_chunk
+            inserted = True
+        yield data[pos:end]
+        pos = end
+        if ctype == b"IEND":
+            break
+
+def probe_metadata(path):
+    # Maps the file instead of reading it: only the headers ahead of the image data are ever paged in.
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return find_metadata(buf)
+
+def find_metadata(buf):
+    # Returns (format, LookeyData JSON string or None) from PNG chunk headers or JPEG APP1 segments, without decoding pixels.
+    if buf[:8] == PNG_SIGNATURE:
+        return "PNG", _png_metadata(buf)
+    if buf[:2] == b"\xff\xd8":
+        return "JPEG", _jpeg_metadata(buf)
+    return None, None
+
+def _png_metadata(buf):
+    pos = 8
+    while pos + 8 <= len(buf):
+        length, ctype = struct.unpack_from(">I4s", buf, pos)
+        if ctype in (b"IDAT", b"IEND"):
+            break
+        if ctype in PNG_TEXT_CHUNKS:
+            keyword, _, rest = buf[pos + 8:pos + 8 + length].partition(b"\x00")
+            if keyword == b"LookeyData":
+                if ctype == b"tEXt":
+                    return rest.decode("latin-1")
+                if ctype == b"zTXt":
+                    return zlib.decompress(rest[1:]).decode("latin-1")
+                # iTXt: compression flag, method, language and translated keyword, then UTF-8 text.
+                compressed, rest = rest[0], rest[2:]
+                text = rest.split(b"\x00", 2)[2]
+                return (zlib.decompress(text) if compressed else text).decode("utf-8")
+        pos += 12 + length
+    return None
+
+def _jpeg_metadata(buf):
+    pos = 2
+    while pos + 4 <= len(buf):
+        if buf[pos] != 0xFF:
+            break
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan: no more metadata segments.
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack_from(">H", buf, pos + 2)[0]
+        if marker == 0xE1 and buf[pos + 4:pos + 10] == b"Exif\x00\x00":
+            comment = _exif_user_comment(buf[pos + 10:pos + 2 + length])
+            if comment:
+                raw = comment.decode("utf-8", errors="ignore")
+                start, end = raw.find("{"), raw.rfind("}") + 1
+                if start != -1 and end > start:
+                    return raw[start:end]
+        pos += 2 + length
+    return None
+
+def _tiff_entry(tiff, order, ifd, tag):
+    for i in range(struct.unpack_from(order + "H", tiff, ifd)[0]):
+        entry = ifd + 2 + i * 12
+        if struct.unpack_from(order + "H", tiff, entry)[0] == tag:
+            return entry
+    return None
+
+def _exif_user_comment(tiff):
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None
+    entry = _tiff_entry(tiff, order, struct.unpack_from(order + "I", tiff, 4)[0], EXIF_IFD_POINTER)
+    if entry is None:
+        return None
+    entry = _tiff_entry(tiff, order, struct.unpack_from(order + "I", tiff, entry + 8)[0], EXIF_USER_COMMENT)
+    if entry is None:
+        return None
+    count = struct.unpack_from(order + "I", tiff, entry + 4)[0]
+    offset = entry + 8 if count <= 4 else struct.unpack_from(order + "I", tiff, entry + 8)[0]
+    return tiff[offset:offset + count]
+
+def probe_record(path, full=False):
+    record = {"path": path, "format": None, "metadata": "none"}
+    try:
+        record["format"], raw_json = probe_metadata(path)
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        record.update(metadata="error", error=str(e))
+        return record
+    if raw_json:
+        try:
+            metadata = json.loads(raw_json)
+            payload = metadata["payload"]
+            record.update(metadata="present", lookey_version=metadata.get("lookey_version"), author=payload.get("author"), timestamp=payload.get("timestamp"))
+            if full:
+                record["lookey_data"] = metadata
+        except (ValueError, KeyError, TypeError):
+            record["metadata"] = "corrupted"
+    return record
+
+def iter_sequence_frames(source, duration_ms=SEQUENCE_FRAME_MS):
+    # Yields (bgr, duration ms) one frame at a time from an animated GIF/APNG or a folder of stills in name order.
+    if os.path.isdir(source):
+        for path in sorted(iter_images(source)):
+            bgr = cv2.imread(path)
+            if bgr is None:
+                raise ValueError(f"Could not read frame {os.path.basename(path)}")
+            yield bgr, duration_ms
+        return
+
+    with Image.open(source) as img:
+        for frame in ImageSequence.Iterator(img):
+            rgb = np.asarray(frame.convert("RGB"))
+            # Pillow reports APNG durations as floats (ms); fcTL needs whole milliseconds.
+            yield cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), int(round(frame.info.get("duration") or duration_ms))
+
+def marked_output_path(image_path):
+    name_only = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(os.path.dirname(image_path), "Lookey_Marked", name_only + ".png")
+
+def _glob_match(rel_path, patterns):
+    name = os.path.basename(rel_path)
+    return any(fnmatch.fnmatch(rel_path, pat) or fnmatch.fnmatch(name, pat) for pat in patterns)
+
+def iter_images(root, recursive=False, include=None, exclude=None, skip_outputs=True):
+    # Yields image paths as scandir finds them, so work starts before a large tree is fully listed.
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    if entry.is_dir(follow_symlinks=False):
+                        if not recursive or (skip_outputs and entry.name in OUTPUT_DIRS):
+                            continue
+                        if exclude and _glob_match(rel_path, exclude):
+                            continue
+                        stack.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(IMAGE_EXTS):
+                        if include and not _glob_match(rel_path, include):
+                            continue
+                        if exclude and _glob_match(rel_path, exclude):
+                            continue
+                        yield entry.path
+        except OSError:
+            continue
+
+def resolve_workers(workers):
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def print_triage(triage, verbose=False):
+    name = os.path.basename(triage["path"])
+    if "error" in triage:
+        print(f"{Fore.RED} {name}: {triage['error']}")
+        return
+
+    color = {"likely": Fore.GREEN, "unlikely": Fore.YELLOW}.get(triage["deep_embed"], Fore.WHITE)
+    predicted = triage["predicted_strategy"] or "-"
+    rate = "texture only, no history" if triage["success_rate"] is None else f"{triage['success_rate']:.0%} success"
+    print(f"{color} {name}: Deep Embed {triage['deep_embed']} ({rate}, start {predicted}) "
+          f"{Style.DIM}std={triage['avg_std']} void={triage['void_ratio']:.1%} noise-safe={triage['safe_for_noise']}")
+    if verbose:
+        print(f"{Style.DIM} {json.dumps(triage, indent=2)}")
+
+def report_profile(profiler, json_path=None):
+    report = profiler.to_dict()
+    rss = peak_rss_mb()
+    if rss is not None:
+        report["peak_rss_mb"] = rss
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"{Style.DIM} Profile written to {json_path}", file=sys.stderr)
+        return
+
+    out = sys.stderr
+    print(f"{Style.DIM}" + "-" * 60, file=out)
+    print(f"{Fore.CYAN} Profile: {report['operations']} operation(s) in {report['wall_s']:.2f}s, {report['strategy_attempts']} strategy attempt(s)", file=out)
+    print(f"{Fore.WHITE} {'STAGE':<18} {'COUNT':>7} {'TOTAL s':>10} {'MEAN ms':>10} {'MAX ms':>10}", file=out)
+    for stage, e in report["stages"].items():
+        print(f" {stage:<18} {e['count']:>7} {e['total_s']:>10.3f} {e['mean_ms']:>10.1f} {e['max_ms']:>10.1f}", file=out)
+    if rss is not None:
+        print(f"{Style.DIM} Peak RSS: {rss} MB", file=out)
+
 def main():
     parser = argparse.ArgumentParser(description="Lookey - Image Integrity & Verification")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     subparsers.add_parser("setup", help="Create your identity").add_argument("name", help="Your Display Name")
-    subparsers.add_parser("sign", help="Sign an image file").add_argument("file", help="Path to image file")
-    subparsers.add_parser("deep-embed", help="Inject invisible Lookey Mark").add_argument("file", help="Path to image file")
-    subparsers.add_parser("verify", help="Verify an image file").add_argument("file", help="Path to image file")
+    sign_parser = subparsers.add_parser("sign", help="Sign an image file")
+    sign_parser.add_argument("file", help="Path to image file")
+    embed_parser = subparsers.add_parser("deep-embed", help="Inject invisible Lookey Mark")
+    embed_parser.add_argument("file", help="Path to image file")
+    sequence_parser = subparsers.add_parser("sign-sequence", help="Deep Embed every frame of a GIF/APNG or a folder of frames into one signed APNG")
+    sequence_parser.add_argument("source", help="Animated GIF/APNG, or a folder of frames (name order)")
+    sequence_parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes (0 = all cores)")
+    sequence_parser.add_argument("--duration", type=int, default=SEQUENCE_FRAME_MS, metavar="MS", help="Frame duration for folders and frames without one")
+    verify_parser = subparsers.add_parser("verify", help="Verify an image file")
+    verify_parser.add_argument("file", help="Path to image file")
     subparsers.add_parser("me", help="Show my public key string")
     subparsers.add_parser("contacts", help="List trusted people")
     subparsers.add_parser("rotate", help="Generate new keys (Archives old ones)")
@@ -541,14 +2336,111 @@ def main():
     contact_parser = subparsers.add_parser("add-contact", help="Trust a contact")
     contact_parser.add_argument("data", help="Name OR the full Invite Code")
     contact_parser.add_argument("key", nargs='?', help="The Public Key (Optional if using Code)")
+    import_parser = subparsers.add_parser("import-contacts", help="Trust every Invite Code in a file (one per line)")
+    import_parser.add_argument("file", help="Text file of Invite Codes as printed by 'me'")
     
     batch_parser = subparsers.add_parser("batch-embed", help="Deep Embed all images in a folder")
     batch_parser.add_argument("folder", help="Path to folder")
+    batch_parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes (0 = all cores)")
+    batch_parser.add_argument("--force", action="store_true", help="Re-embed every file even if the manifest says it is unchanged")
+    batch_parser.add_argument("--no-manifest", action="store_true", help="Do not read or update the batch manifest")
+
+    for p in (sign_parser, embed_parser, batch_parser):
+        p.add_argument("--tree-hash", action="store_true", help=f"Use the parallel tree pixel hash (lookey_version {TREE_HASH_VERSION})")
+    for p in (embed_parser, batch_parser):
+        p.add_argument("--parallel-strategies", action="store_true", help="Try all embed strategies at once and keep the weakest that survives")
+        p.add_argument("--no-predict", action="store_true", help="Always try embed strategies from weakest to strongest")
+        p.add_argument("--dry-run", action="store_true", help="Only analyze texture and predict whether Deep Embed will work")
+        p.add_argument("--proxy", type=int, metavar="PX", help="Analyze a downsampled proxy no larger than PX on its long side (dry run)")
+    for p in (embed_parser, batch_parser):
+        p.add_argument("--max-memory", type=int, metavar="MB", help="Per-process memory budget: reuse strip buffers, run attempts one at a time and skip images that would not fit")
+
+    verify_folder_parser = subparsers.add_parser("verify-folder", help="Verify all images in a folder (NDJSON output)")
+    verify_folder_parser.add_argument("folder", help="Path to folder")
+    verify_folder_parser.add_argument("--workers", type=int, default=0, help="Parallel worker processes (0 = all cores)")
+    verify_folder_parser.add_argument("--output", help="Write NDJSON to this file instead of stdout")
+
+    probe_parser = subparsers.add_parser("probe", help="List which files carry Lookey metadata, reading headers only (NDJSON output)")
+    probe_parser.add_argument("paths", nargs="+", help="Image files or folders")
+    probe_parser.add_argument("--output", help="Write NDJSON to this file instead of stdout")
+    probe_parser.add_argument("--present", action="store_true", help="Only list files that carry Lookey metadata")
+    probe_parser.add_argument("--full", action="store_true", help="Include the whole LookeyData JSON in each record")
+    probe_parser.add_argument("--signatures", action="store_true", help="Also check each signature against its embedded key (pixels are still not hashed)")
+    probe_parser.add_argument("--workers", type=int, default=0, help="Signature check threads (0 = all cores)")
+    for p in (verify_parser, verify_folder_parser):
+        p.add_argument("--no-cache", action="store_true", help="Ignore and do not update the verification result cache")
+        p.add_argument("--prefilter", action="store_true", help="Skip the watermark decode when a sampled presence test finds no mark (faster, but can miss weak marks)")
+
+    robust_parser = subparsers.add_parser("robustness-bench", help="Measure Lookey Mark survival under simulated platform transforms")
+    robust_parser.add_argument("corpus", nargs="?", help="Folder of images (default: synthetic photo and dark images)")
+    robust_parser.add_argument("--strategies", metavar="LIST", help="Comma separated noise/strength pairs (default 0/36,0/60,2/50,4/90)")
+    robust_parser.add_argument("--transforms", metavar="LIST", help="Comma separated transforms (default: all)")
+    robust_parser.add_argument("--max-side", type=int, default=1024, metavar="PX", help="Downscale corpus images to this long side first (0 = original size)")
+    robust_parser.add_argument("--limit", type=int, help="Use at most this many images")
+    robust_parser.add_argument("--kinds", help="Synthetic image kinds when no corpus is given (default photo,dark)")
+    robust_parser.add_argument("--sizes", help="Synthetic square sizes when no corpus is given (default 1024)")
+    robust_parser.add_argument("--seeds", type=int, default=4, help="Synthetic images per kind and size")
+    robust_parser.add_argument("--workers", type=int, default=0, help="Parallel worker processes (0 = all cores)")
+    robust_parser.add_argument("--output", default="lookey_robustness.json", help="Where to write the JSON results")
+
+    for p in (batch_parser, verify_folder_parser, probe_parser, robust_parser):
+        p.add_argument("-r", "--recursive", action="store_true", help="Also process images in subfolders")
+        p.add_argument("--include", action="append", metavar="GLOB", help="Only process files matching this glob (repeatable)")
+        p.add_argument("--exclude", action="append", metavar="GLOB", help="Skip files and folders matching this glob (repeatable)")
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark sign, deep-embed and verify on synthetic images")
+    bench_parser.add_argument("--sizes", help="Comma separated square sizes (default 512,1024,2048)")
+    bench_parser.add_argument("--kinds", help="Comma separated image kinds: flat,photo,dark")
+    bench_parser.add_argument("--repeat", type=int, default=3, help="Runs per operation")
+    bench_parser.add_argument("--output", default="lookey_bench.json", help="Where to write the JSON results")
+    bench_parser.add_argument("--baseline", help="Compare the new results against this JSON file")
+    bench_parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Only compare two result files")
+    bench_parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio reported as a regression")
+    bench_parser.add_argument("--startup", action="store_true", help="Only measure CLI cold start and check it against the budget")
+    bench_parser.add_argument("--startup-budget", type=float, default=500, metavar="MS", help="Cold start budget for `contacts` in ms")
+
+    serve_parser = subparsers.add_parser("serve", help="Run a local sign/verify server with a warm backend")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="TCP port (default 8765)")
+    serve_parser.add_argument("--socket", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    serve_parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = all cores)")
+    serve_parser.add_argument("--quiet", action="store_true", help="Do not log each request")
+    serve_parser.add_argument("--max-memory", type=int, metavar="MB", help="Per-worker memory budget for deep embeds")
+
+    for p in subparsers.choices.values():
+        p.add_argument("--profile", action="store_true", help="Print a per-stage timing breakdown")
+        p.add_argument("--profile-json", metavar="FILE", help="Write the per-stage timing breakdown as JSON")
 
     args = parser.parse_args()
-    backend = LookeyBackend()
-
+    profiler = StageProfiler() if getattr(args, "profile", False) or getattr(args, "profile_json", None) else None
 
+    started = time.perf_counter()
+    backend = LookeyBackend()
+    if profiler:
+        profiler.add({"startup": time.perf_counter() - started})
+    if getattr(args, "tree_hash", False):
+        backend.use_hash_version(TREE_HASH_VERSION)
+    if getattr(args, "parallel_strategies", False):
+        backend.parallel_strategies = True
+    if getattr(args, "no_predict", False):
+        backend.predict_strategy = False
+    if getattr(args, "max_memory", None):
+        backend.max_memory_mb = args.max_memory
+    if getattr(args, "no_cache", False):
+        backend.use_verify_cache = False
+    if getattr(args, "prefilter", False):
+        backend.watermark_prefilter = True
+
+
+
+    try:
+        run_command(args, parser, backend, profiler)
+    finally:
+        if profiler:
+            report_profile(profiler, args.profile_json)
+
+def run_command(args, parser, backend, profiler=None):
+    track = profiler.add_result if profiler else (lambda result: None)
 
     if args.command == "setup":
         if backend.is_setup():
@@ -558,22 +2450,38 @@ def main():
             print(f"{Fore.GREEN} Identity created for '{args.name}'.")
 
     elif args.command == "sign":
-        success, msg = backend.sign_image(args.file)
-        if success:
-            print(f"{Fore.GREEN} {msg}")
+        result = backend.sign_image(args.file)
+        track(result)
+        if result.success:
+            print(f"{Fore.GREEN} {result.msg}")
         else:
-            print(f"{Fore.RED} Error: {msg}")
+            print(f"{Fore.RED} Error: {result.msg}")
+
+    elif args.command == "deep-embed" and args.dry_run:
+        print_triage(backend.triage_image(args.file, args.proxy), verbose=True)
 
     elif args.command == "deep-embed":
-        success, msg = backend.sign_invisible(args.file)
-        if success:
-            print(f"{Fore.GREEN} {msg}")
+        result = backend.sign_invisible(args.file)
+        track(result)
+        if result.success:
+            print(f"{Fore.GREEN} {result.msg}")
             print(f"{Fore.CYAN} This file contains a permanent Lookey Mark.")
         else:
-            print(f"{Fore.RED} Error: {msg}")
+            print(f"{Fore.RED} Error: {result.msg}")
+        if args.max_memory and result.peak_rss_mb:
+            print(f"{Style.DIM} Peak RSS: {result.peak_rss_mb} MB of {args.max_memory} MB budget")
+
+    elif args.command == "sign-sequence":
+        result = backend.sign_sequence(args.source, resolve_workers(args.workers), args.duration)
+        track(result)
+        if result.success:
+            print(f"{Fore.GREEN} {result.msg}")
+        else:
+            print(f"{Fore.RED} Error: {result.msg}")
 
     elif args.command == "verify":
         res = backend.verify_image(args.file)
+        track(res)
         status = res["status"]
         
         if status == "TRUSTED":
@@ -591,6 +2499,11 @@ def main():
         else:
             print(f"{Fore.RED} {res['msg']}")
 
+        if len(res.get("id_candidates", [])) > 1:
+            others = res['id_candidates'][1:]
+            more = f" (+{len(others) - 10} more)" if len(others) > 10 else ""
+            print(f"{Fore.YELLOW} Deep Embed ID also matches: {', '.join(others[:10])}{more}")
+
     elif args.command == "me":
         key = backend.get_my_public_key_string()
         name = backend.user_name
@@ -626,14 +2539,7 @@ def main():
             key_to_add = args.key
         else:
             try:
-                if args.data.strip().startswith("{") or args.data.strip().startswith("'"):
-                    clean_data = args.data.strip("'").strip('"')
-                    invite = json.loads(clean_data)
-                else:
-                    decoded_json = base64.b64decode(args.data).decode('utf-8')
-                    invite = json.loads(decoded_json)
-                name_to_add = invite.get("name")
-                key_to_add = invite.get("key")
+                name_to_add, key_to_add = parse_invite_code(args.data)
                 print(f"{Fore.CYAN} Detected Invite Code for '{name_to_add}'...")
             except:
                 print(f"{Fore.RED} Error: Invalid Invite Code format.")
@@ -646,6 +2552,31 @@ def main():
             if not args.key:
                 print(f"{Fore.RED} Error: Could not extract Name and Key.")
 
+    elif args.command == "import-contacts":
+        invites = []
+        bad_lines = []
+        try:
+            with open(args.file, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    try:
+                        invites.append(parse_invite_code(line))
+                    except Exception:
+                        bad_lines.append(line_no)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"{Fore.RED} Error: Could not read {args.file}: {e.strerror if isinstance(e, OSError) else 'not a UTF-8 text file'}")
+            return
+
+        added, updated, rejected = backend.import_contacts(invites)
+        print(f"{Fore.GREEN} Imported {added} new contact(s), updated {updated}.")
+        if bad_lines:
+            shown = ", ".join(str(n) for n in bad_lines[:10]) + (" ..." if len(bad_lines) > 10 else "")
+            print(f"{Fore.RED} {len(bad_lines)} line(s) were not valid Invite Codes: {shown}")
+        if rejected:
+            print(f"{Fore.RED} {len(rejected)} contact(s) had an invalid key: {', '.join(rejected[:10])}")
+
     elif args.command == "contacts":
         if not backend.contacts:
             print(f"{Fore.YELLOW} Your contact list is empty.")
@@ -665,25 +2596,147 @@ def main():
             print(f"{Fore.RED} Error: Not a directory.")
             return
 
-        valid_exts = ('.jpg', '.jpeg', '.png')
-        files = [f for f in os.listdir(args.folder) if f.lower().endswith(valid_exts)]
+        if args.dry_run:
+            paths = iter_images(args.folder, args.recursive, args.include, args.exclude)
+            verdicts = {}
+            for triage in backend.batch_triage(paths, resolve_workers(args.workers), args.proxy):
+                print_triage(triage)
+                verdict = triage.get("deep_embed", "error")
+                verdicts[verdict] = verdicts.get(verdict, 0) + 1
+            print(f"{Style.DIM}" + "-" * 40)
+            print(f"{Fore.CYAN} " + " | ".join(f"{count} {verdict}" for verdict, count in sorted(verdicts.items())))
+            return
+
+        workers = resolve_workers(args.workers)
         
-        print(f"{Fore.CYAN} Found {len(files)} images. Starting batch deep embed...")
+        print(f"{Fore.CYAN} Starting batch deep embed on {args.folder} ({workers} worker{'s' if workers != 1 else ''})...")
         print(f"{Style.DIM}" + "-" * 40)
         
-        count = 0
-        for filename in files:
-            full_path = os.path.join(args.folder, filename)
-            success, msg = backend.sign_invisible(full_path)
-            if success:
-                print(f"{Fore.GREEN} {msg}")
-                count += 1
+        manifest = None
+        if not args.no_manifest:
+            manifest = backend.open_manifest()
+            manifest.force = args.force
+
+        counts = {"deep": 0, "standard": 0, "error": 0}
+        reused = 0
+        total = 0
+        peak_rss = 0
+        paths = iter_images(args.folder, args.recursive, args.include, args.exclude)
+        for result in backend.batch_sign_invisible(paths, workers, manifest):
+            track(result)
+            total += 1
+            counts[result.outcome] += 1
+            peak_rss = max(peak_rss, result.peak_rss_mb or 0)
+            if result.reused:
+                reused += 1
+                print(f"{Style.DIM} {os.path.basename(result.source_path)}: {result.msg}")
+            elif result.success:
+                print(f"{Fore.GREEN} {result.msg}")
             else:
-                print(f"{Fore.RED} {filename}: {msg}")
+                print(f"{Fore.RED} {os.path.basename(result.source_path)}: {result.msg}")
         
         print(f"{Style.DIM}" + "-" * 40)
-        print(f"{Fore.CYAN} Processed {count}/{len(files)} images.")
+        print(f"{Fore.CYAN} Processed {counts['deep'] + counts['standard']}/{total} images.")
+        print(f"{Fore.CYAN} {counts['deep']} Deep Embedded | {counts['standard']} Metadata Signed | {counts['error']} Failed")
+        if reused:
+            print(f"{Style.DIM} {reused} unchanged or duplicate file(s) reused from the manifest.")
+        if peak_rss:
+            print(f"{Style.DIM} Peak worker RSS: {peak_rss} MB" + (f" (budget {args.max_memory} MB)" if args.max_memory else ""))
     
+    elif args.command == "verify-folder":
+        if not os.path.isdir(args.folder):
+            print(f"{Fore.RED} Error: Not a directory.")
+            return
+
+        # Output folders are what people usually verify, so they are not skipped here.
+        paths = iter_images(args.folder, args.recursive, args.include, args.exclude, skip_outputs=False)
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        counts = {}
+        total = 0
+        started = time.perf_counter()
+        try:
+            for record in backend.batch_verify(paths, resolve_workers(args.workers)):
+                if profiler:
+                    profiler.add({stage: t / 1000 for stage, t in record["timings_ms"].items()})
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+                total += 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+            summary = {"summary": counts, "total": total, "elapsed_s": round(time.perf_counter() - started, 2)}
+            out.write(json.dumps(summary) + "\n")
+        finally:
+            if args.output:
+                out.close()
+
+        if args.output:
+            print(f"{Fore.CYAN} Verified {total} images -> {args.output}")
+            for status, count in sorted(counts.items()):
+                print(f"{Fore.WHITE} {status:<16} {count}")
+
+    elif args.command == "probe":
+        def paths():
+            for path in args.paths:
+                if os.path.isdir(path):
+                    yield from iter_images(path, args.recursive, args.include, args.exclude, skip_outputs=False)
+                else:
+                    yield path
+
+        def emit(batch):
+            if args.signatures:
+                signed = [r for r in batch if r["metadata"] == "present"]
+                fingerprints = backend.verify_signatures([r["lookey_data"] for r in signed], args.workers)
+                for record, fingerprint in zip(signed, fingerprints):
+                    record["signature"] = "valid" if fingerprint else "invalid"
+                    record["signer"] = fingerprint
+                    record["contact"] = backend.contacts.get(fingerprint, {}).get("name") if fingerprint else None
+                    counts[record["signature"] + "_signature"] = counts.get(record["signature"] + "_signature", 0) + 1
+            for record in batch:
+                if not args.full:
+                    record.pop("lookey_data", None)
+                if args.present and record["metadata"] != "present":
+                    continue
+                out.write(json.dumps(record) + "\n")
+
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        counts = {}
+        total = 0
+        started = time.perf_counter()
+        try:
+            batch = []
+            for path in paths():
+                record = probe_record(path, args.full or args.signatures)
+                counts[record["metadata"]] = counts.get(record["metadata"], 0) + 1
+                total += 1
+                batch.append(record)
+                if len(batch) >= PROBE_BATCH:
+                    emit(batch)
+                    batch = []
+            emit(batch)
+
+            summary = {"summary": counts, "total": total, "elapsed_s": round(time.perf_counter() - started, 2)}
+            out.write(json.dumps(summary) + "\n")
+        finally:
+            if args.output:
+                out.close()
+
+        if args.output:
+            print(f"{Fore.CYAN} Probed {total} files -> {args.output}")
+            for status, count in sorted(counts.items()):
+                print(f"{Fore.WHITE} {status:<16} {count}")
+
+    elif args.command == "bench":
+        import lookey_bench
+        sys.exit(lookey_bench.main(args))
+
+    elif args.command == "robustness-bench":
+        import lookey_robustness
+        sys.exit(lookey_robustness.main(args))
+
+    elif args.command == "serve":
+        import lookey_server
+        sys.exit(lookey_server.main(args, backend))
+
     elif args.command == "rotate":
         print(f"{Fore.RED} WARNING: This will change your Identity Key.")
         print(" Your old key will be saved in your Contacts list so you can still verify old photos.")
@@ -703,4 +2756,5 @@ def main():
         parser.print_help()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
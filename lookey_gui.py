@@ -6,6 +6,11 @@ import json
 import base64
 import sys
 import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
 def resource_path(relative_path):
     try:
@@ -15,7 +20,9 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-from lookey_cli import LookeyBackend
+from lookey_cli import LookeyBackend, iter_images, resolve_workers
+
+POLL_MS = 150
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("green")
@@ -24,6 +31,13 @@ class LookeyApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.backend = LookeyBackend()
+        # Backend calls run here, one at a time; the Tk thread only reads their events through after().
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.job = None
+        self.job_done = None
+        self.batch_total = None
         self.title("Lookey")
         self.geometry("850x600")
         self.resizable(False, False)
@@ -43,6 +57,8 @@ class LookeyApp(ctk.CTk):
         else:
             self.show_main_screen()
 
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def show_setup_screen(self):
         self.clear_window()
         
@@ -128,68 +144,165 @@ class LookeyApp(ctk.CTk):
         self.btn_batch = ctk.CTkButton(btn_frame, text="Batch Sign Folder", width=460, height=40, font=("Roboto", 14, "bold"), fg_color="#222", hover_color="#4A235A", border_width=1, border_color="#5B2C6F", command=self.gui_batch_sign)
         self.btn_batch.grid(row=1, column=0, columnspan=3, pady=(5, 0))
 
+        self.btn_cancel = ctk.CTkButton(btn_frame, text="Cancel", width=140, height=32, fg_color="#922B21", hover_color="#641E16", command=self.cancel_job)
+        self.btn_cancel.grid(row=2, column=0, columnspan=3, pady=(15, 0))
+        self.btn_cancel.grid_remove()
+
+    def run_job(self, work, on_done, cancellable=False):
+        if self.job is not None:
+            return
+        self.job_done = on_done
+        self.cancel_event.clear()
+        self.set_busy(True, cancellable)
+        self.job = self.executor.submit(work)
+        self.after(POLL_MS, self._poll_job)
+
+    def _poll_job(self):
+        # Only the newest progress event is drawn per tick, so big batches cannot flood the event loop.
+        progress = None
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "total":
+                self.batch_total = payload
+            else:
+                progress = payload
+        if progress:
+            self.show_progress(*progress)
+
+        if not self.job.done():
+            self.after(POLL_MS, self._poll_job)
+            return
+
+        job, self.job = self.job, None
+        self.set_busy(False)
+        try:
+            result = job.result()
+        except Exception as e:
+            self.update_status("❌", "Operation Failed", str(e), "#FF4444")
+            return
+        self.job_done(result)
+
+    def cancel_job(self):
+        self.cancel_event.set()
+        self.btn_cancel.configure(state="disabled", text="Cancelling...")
+
+    def set_busy(self, busy, cancellable=False):
+        state = "disabled" if busy else "normal"
+        for btn in (self.btn_sign, self.btn_spy, self.btn_verify, self.btn_batch):
+            btn.configure(state=state)
+        if busy and cancellable:
+            self.btn_cancel.configure(state="normal", text="Cancel")
+            self.btn_cancel.grid()
+        else:
+            self.btn_cancel.grid_remove()
+
+    def show_progress(self, done, elapsed, current):
+        rate = done / elapsed if elapsed > 0 else 0
+        total = self.batch_total
+        if total is None:
+            count = f"{done} images (still scanning)"
+            eta = ""
+        else:
+            count = f"{done}/{total} images"
+            eta = f" · ETA {self._format_eta((total - done) / rate)}" if rate and total > done else ""
+        self.update_status("⏳", "Batch Processing...", f"{count} · {rate:.1f}/s{eta}\n{current}", "orange")
+
+    def _format_eta(self, seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+    def on_close(self):
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.destroy()
+
     def gui_sign(self):
         path = filedialog.askopenfilename(filetypes=[("Images", "*.jpg *.jpeg *.png")])
         if path:
-            success, msg = self.backend.sign_image(path)
-            if success:
-                self.update_status("✅", "Signed (Standard)", msg, "#2CC985")
+            result = self.backend.sign_image(path)
+            if result.success:
+                self.update_status("✅", "Signed (Standard)", result.msg, "#2CC985")
             else:
-                self.update_status("❌", "Signing Failed", msg, "#FF4444")
+                self.update_status("❌", "Signing Failed", result.msg, "#FF4444")
                 
     def gui_deep_embed(self):
         path = filedialog.askopenfilename(filetypes=[("Images", "*.jpg *.jpeg *.png")])
         if path:
             self.update_status("⏳", "Embedding Mark...", "Calculating frequencies...", "orange")
-            self.update_idletasks()
-            
-            success, msg = self.backend.sign_invisible(path)
-            
-            if success:
-                if "Standard Signature" in msg:
-                    self.update_status("⚠️", "Deep Embed Failed", "Image too flat. Applied Standard Tag instead.", "#F39C12")
-                else:
-                    self.update_status("⚓", "Deep Embed Complete", msg, "#AF7AC5")
+            self.run_job(lambda: self.backend.sign_invisible(path), self.show_deep_embed_result)
+
+    def show_deep_embed_result(self, result):
+        if result.success:
+            if result.mode == "standard":
+                self.update_status("⚠️", "Deep Embed Failed", "Image too flat. Applied Standard Tag instead.", "#F39C12")
             else:
-                self.update_status("❌", "Operation Failed", msg, "#FF4444")
+                self.update_status("⚓", "Deep Embed Complete", result.msg, "#AF7AC5")
+        else:
+            self.update_status("❌", "Operation Failed", result.msg, "#FF4444")
                 
     def gui_batch_sign(self):
         folder_path = filedialog.askdirectory()
         if not folder_path: return
 
-        valid_exts = ('.jpg', '.jpeg', '.png')
-        files = [f for f in os.listdir(folder_path) if f.lower().endswith(valid_exts)]
-        
-        if not files:
+        self.batch_total = None
+        self.update_status("⏳", "Batch Processing...", f"Starting on {os.path.basename(folder_path)}", "orange")
+        threading.Thread(target=self._count_images, args=(folder_path,), daemon=True).start()
+        self.run_job(lambda: self._run_batch(folder_path), self.show_batch_result, cancellable=True)
+
+    def _count_images(self, folder_path):
+        # The batch streams its inputs, so the total for the ETA is counted alongside it.
+        total = 0
+        for _ in iter_images(folder_path):
+            if self.cancel_event.is_set():
+                return
+            total += 1
+        self.events.put(("total", total))
+
+    def _run_batch(self, folder_path):
+        counts = {"deep": 0, "standard": 0, "error": 0}
+        workers = resolve_workers(None)
+        started = time.perf_counter()
+
+        paths = iter_images(folder_path)
+        results = self.backend.batch_sign_invisible(paths, workers, self.backend.open_manifest())
+        try:
+            for result in results:
+                filename = os.path.basename(result.source_path)
+                outcome = result.outcome
+                counts[outcome] += 1
+                
+                if result.reused:
+                    print(f"[Batch] Reused ({result.reused}): {filename}")
+                elif outcome == "standard":
+                    print(f"[Batch] Fallback: {filename}")
+                elif outcome == "deep":
+                    print(f"[Batch] Deep Embed: {filename}")
+                else:
+                    print(f"[Batch] Error: {filename} - {result.msg}")
+
+                self.events.put(("progress", (sum(counts.values()), time.perf_counter() - started, filename)))
+                if self.cancel_event.is_set():
+                    break
+        finally:
+            results.close()
+        return counts, self.cancel_event.is_set()
+
+    def show_batch_result(self, outcome):
+        counts, cancelled = outcome
+        if not sum(counts.values()) and not cancelled:
             self.update_status("⚠️", "No Images Found", "Folder contains no JPG/PNG files.", "orange")
             return
 
-        deep_count = 0
-        std_count = 0
-        errors = 0
-        total = len(files)
-        
-        self.update_status("⏳", "Batch Processing...", f"Starting on {total} images", "orange")
-        self.update_idletasks()
-
-        for filename in files:
-            full_path = os.path.join(folder_path, filename)
-            success, msg = self.backend.sign_invisible(full_path)
-            
-            if success:
-                if "Standard Signature" in msg:
-                    std_count += 1
-                    print(f"[Batch] Fallback: {filename}")
-                else:
-                    deep_count += 1
-                    print(f"[Batch] Deep Embed: {filename}")
-            else:
-                errors += 1
-                print(f"[Batch] Error: {filename} - {msg}")
-        
+        deep_count, std_count, errors = counts["deep"], counts["standard"], counts["error"]
         summary = f"{deep_count} Deep Embedded | {std_count} Metadata Signed"
         
-        if errors == 0:
+        if cancelled:
+            self.update_status("⏹", "Batch Cancelled", f"{summary} | {errors} Failed", "orange")
+        elif errors == 0:
             self.update_status("✅", "Batch Complete", summary, "#2CC985")
         else:
             self.update_status("⚠️", "Batch Finished", f"{summary} | {errors} Failed", "orange")
@@ -197,7 +310,11 @@ class LookeyApp(ctk.CTk):
     def gui_verify(self):
         path = filedialog.askopenfilename(filetypes=[("Images", "*.jpg *.jpeg *.png")])
         if path:
-            res = self.backend.verify_image(path)
+            self.update_status("⏳", "Verifying...", os.path.basename(path), "orange")
+            self.run_job(lambda: self.backend.verify_image(path), self.show_verify_result)
+
+    def show_verify_result(self, res):
+        if res:
             status = res["status"]
 
             time_display = ""
@@ -212,10 +329,16 @@ class LookeyApp(ctk.CTk):
                     except:
                         name = "Unknown"
                         
+                    collision = ""
+                    if len(res.get("id_candidates", [])) > 1:
+                        others = res['id_candidates'][1:]
+                        more = f" (+{len(others) - 5} more)" if len(others) > 5 else ""
+                        collision = f"\nID also matches: {', '.join(others[:5])}{more}"
+                        
                     self.update_status(
                         "⚓", 
                         f"Source Confirmed: {name}", 
-                        f"Deep Embed found. Metadata missing.\n{time_display.strip()}", 
+                        f"Deep Embed found. Metadata missing.\n{time_display.strip()}{collision}", 
                         "#AF7AC5"
                     )
 
@@ -355,5 +478,6 @@ class LookeyApp(ctk.CTk):
             widget.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = LookeyApp()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import multiprocessing.util
+
+import cv2
+import numpy as np
+from colorama import Fore, Style
+
+from lookey_cli import LookeyBackend, iter_images, resolve_workers, _pool_map, _worker_lost, PRESENCE_MIN_Z
+from lookey_bench import make_image, _percentile, _environment
+
+STRATEGIES = ((0, 36), (0, 60), (2, 50), (4, 90))
+DEFAULT_KINDS = ("photo", "dark")
+DEFAULT_SIZE = 1024
+DEFAULT_SEEDS = 4
+DEFAULT_MAX_SIDE = 1024
+PROGRESS_EVERY_S = 5
+
+
+def _jpeg(quality):
+    def transform(bgr):
+        ok, buf = cv2.imencode(".jpg", bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR) if ok else None
+    return transform
+
+
+def _webp(quality):
+    def transform(bgr):
+        ok, buf = cv2.imencode(".webp", bgr, [int(cv2.IMWRITE_WEBP_QUALITY), quality])
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR) if ok else None
+    return transform
+
+
+def _png(bgr):
+    ok, buf = cv2.imencode(".png", bgr, [cv2.IMWRITE_PNG_COMPRESSION, 9])
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR) if ok else None
+
+
+def _scale(factor):
+    # Platforms resize and serve the smaller file; the scan runs on what they serve.
+    def transform(bgr):
+        h, w = bgr.shape[:2]
+        return cv2.resize(bgr, (max(1, round(w * factor)), max(1, round(h * factor))), interpolation=cv2.INTER_AREA)
+    return transform
+
+
+def _color_round_trip(forward, backward):
+    def transform(bgr):
+        return cv2.cvtColor(cv2.cvtColor(bgr, forward), backward)
+    return transform
+
+
+def _chroma_420(bgr):
+    # 4:2:0 chroma subsampling without the JPEG quantization, as done by video-style pipelines.
+    ycrcb = cv2.cvtColor(bgr, cv2.COLOR_BGR2YCrCb)
+    h, w = ycrcb.shape[:2]
+    for c in (1, 2):
+        small = cv2.resize(ycrcb[:, :, c], (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+        ycrcb[:, :, c] = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+
+# Simulated platform handling, applied in memory to the marked pixels.
+TRANSFORMS = {
+    "none": lambda bgr: bgr,
+    "png-9": _png,
+    "jpeg-95": _jpeg(95),
+    "jpeg-90": _jpeg(90),
+    "jpeg-85": _jpeg(85),
+    "jpeg-75": _jpeg(75),
+    "jpeg-60": _jpeg(60),
+    "webp-90": _webp(90),
+    "webp-75": _webp(75),
+    "scale-0.75": _scale(0.75),
+    "scale-0.5": _scale(0.5),
+    "ycrcb": _color_round_trip(cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2BGR),
+    "lab": _color_round_trip(cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR),
+    "chroma-420": _chroma_420
+}
+
+
+_backend = None
+_session = None
+
+
+def _init_worker(cv_threads, data_dir):
+    global _backend, _session
+    cv2.setNumThreads(cv_threads)
+    _backend = LookeyBackend(data_dir)
+    _session = _backend.signing_session().open()
+    multiprocessing.util.Finalize(_session, _session.close, exitpriority=10)
+
+
+def _load(source, max_side):
+    if source[0] == "synthetic":
+        bgr = make_image(*source[1:])
+    else:
+        bgr = _backend._load_embed_source(source[1])
+        if bgr is None:
+            return None
+
+    h, w = bgr.shape[:2]
+    if max_side and max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        bgr = cv2.resize(bgr, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+        h, w = bgr.shape[:2]
+    # The encoder works on even dimensions, as in _load_embed_source.
+    return bgr[:h // 2 * 2, :w // 2 * 2]
+
+
+def _source_label(source):
+    if source[0] == "synthetic":
+        return f"{source[1]}-{source[2]}-{source[3]}"
+    return source[1]
+
+
+def _run_job(job):
+    # One embed per (image, strategy); every transform reuses the marked pixels.
+    source, strategy, transforms, max_side = job
+    record = {"source": _source_label(source), "strategy": f"{strategy[0]}/{strategy[1]}"}
+    try:
+        bgr = _load(source, max_side)
+        if bgr is None:
+            record["error"] = "Could not read image"
+            return record
+        record["width"], record["height"] = bgr.shape[1], bgr.shape[0]
+        # How often an unsigned image would still pay for the full decode.
+        record["unmarked_presence"] = round(_backend._watermark_presence(bgr), 2)
+
+        encoder = _backend._make_encoder(_session)
+        expected = np.packbits(encoder._watermarks).tobytes()
+        started = time.perf_counter()
+        encoded = _backend._apply_strategy(bgr, encoder, *strategy, {})
+        record["embed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        # Same decode and identity match as _verify_invisible_scan, on the transformed pixels.
+        results = {}
+        for name in transforms:
+            started = time.perf_counter()
+            out = TRANSFORMS[name](encoded)
+            raw_bytes = _backend._decode_watermark(out)
+            found = _backend._resolve_watermark(raw_bytes) if raw_bytes else None
+            results[name] = {
+                "survived": bool(found and found["name"] == _backend.user_name),
+                "exact": raw_bytes == expected,
+                "presence": round(_backend._watermark_presence(out), 2) if out is not None else 0.0,
+                "ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        record["transforms"] = results
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def build_corpus(corpus=None, recursive=False, include=None, exclude=None, kinds=DEFAULT_KINDS, sizes=(DEFAULT_SIZE,), seeds=DEFAULT_SEEDS, limit=None):
+    if corpus:
+        sources = [("file", path) for path in iter_images(corpus, recursive, include, exclude, skip_outputs=False)]
+    else:
+        sources = [("synthetic", kind, size, seed) for kind in kinds for size in sizes for seed in range(seeds)]
+    return sources[:limit] if limit else sources
+
+
+def run_robustness(sources, strategies=STRATEGIES, transforms=tuple(TRANSFORMS), workers=1, max_side=DEFAULT_MAX_SIDE):
+    work_dir = tempfile.mkdtemp(prefix="lookey_robustness_")
+    try:
+        # A throwaway identity: the scan only has to tell "our mark" from "not our mark".
+        data_dir = os.path.join(work_dir, "data")
+        bench_backend = LookeyBackend(data_dir)
+        bench_backend.setup_user("Bench")
+
+        jobs = [(source, strategy, transforms, max_side) for source in sources for strategy in strategies]
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        records = []
+        started = last_report = time.perf_counter()
+        lost = lambda job, e: {"source": _source_label(job[0]), "strategy": f"{job[1][0]}/{job[1][1]}", "error": _worker_lost(e)}
+        for record in _pool_map(_run_job, jobs, workers, _init_worker, (cv_threads, data_dir), on_error=lost):
+            records.append(record)
+            if time.perf_counter() - last_report >= PROGRESS_EVERY_S:
+                last_report = time.perf_counter()
+                print(f"{Style.DIM} {len(records)}/{len(jobs)} embeds, {len(records) * len(transforms)} pairs, {last_report - started:.0f}s")
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return summarize(records, strategies, transforms, elapsed, workers, max_side)
+
+
+def summarize(records, strategies, transforms, elapsed, workers, max_side):
+    table = {}
+    for strategy in strategies:
+        name = f"{strategy[0]}/{strategy[1]}"
+        done = [r for r in records if r["strategy"] == name and "transforms" in r]
+        embed_ms = [r["embed_ms"] for r in done]
+        per_transform = {}
+        survived = missed = 0
+        for transform in transforms:
+            results = [r["transforms"][transform] for r in done]
+            per_transform[transform] = {
+                "survival": round(sum(x["survived"] for x in results) / len(results), 4) if results else None,
+                "exact": round(sum(x["exact"] for x in results) / len(results), 4) if results else None,
+                "p50_ms": round(_percentile([x["ms"] for x in results], 0.5), 2) if results else None
+            }
+            survived += sum(x["survived"] for x in results)
+            missed += sum(x["survived"] and x["presence"] < PRESENCE_MIN_Z for x in results)
+        table[name] = {
+            "images": len(done),
+            "embed_p50_ms": round(_percentile(embed_ms, 0.5), 2) if embed_ms else None,
+            # Surviving marks the presence pre-filter would have skipped (verify false negatives).
+            "prefilter_misses": missed,
+            "prefilter_miss_rate": round(missed / survived, 4) if survived else None,
+            "transforms": per_transform
+        }
+
+    pairs = sum(len(r.get("transforms", {})) for r in records)
+    unmarked = [r["unmarked_presence"] for r in records if "unmarked_presence" in r]
+    return {
+        "environment": _environment(),
+        "config": {"transforms": list(transforms), "workers": workers, "max_side": max_side},
+        "elapsed_s": round(elapsed, 2),
+        "embeds": len(records),
+        "pairs": pairs,
+        "pairs_per_s": round(pairs / elapsed, 2) if elapsed else None,
+        "prefilter": {
+            "min_z": PRESENCE_MIN_Z,
+            "unmarked_pass_rate": round(sum(z >= PRESENCE_MIN_Z for z in unmarked) / len(unmarked), 4) if unmarked else None,
+            "unmarked_max_z": max(unmarked) if unmarked else None
+        },
+        "strategies": table,
+        "errors": [{"source": r["source"], "strategy": r["strategy"], "error": r["error"]} for r in records if "error" in r]
+    }
+
+
+def print_report(report):
+    strategies = list(report["strategies"])
+    print(f"{Style.DIM}" + "-" * (14 + 11 * len(strategies)))
+    print(f"{Fore.WHITE} {'TRANSFORM':<12}" + "".join(f"{name:>11}" for name in strategies))
+    for transform in report["config"]["transforms"]:
+        cells = []
+        for name in strategies:
+            rate = report["strategies"][name]["transforms"][transform]["survival"]
+            cells.append(f"{'-' if rate is None else f'{rate:.0%}':>11}")
+        print(f" {transform:<12}" + "".join(cells))
+    print(f"{Style.DIM}" + "-" * (14 + 11 * len(strategies)))
+    print(f"{Fore.WHITE} {'embed p50 ms':<12}" + "".join(f"{'-' if s['embed_p50_ms'] is None else s['embed_p50_ms']:>11}" for s in report["strategies"].values()))
+    print(f"{Fore.WHITE} {'prefilter miss':<12}" + "".join(f"{s['prefilter_misses']:>11}" for s in report["strategies"].values()))
+    prefilter = report["prefilter"]
+    if prefilter["unmarked_pass_rate"] is not None:
+        print(f"{Style.DIM} Presence pre-filter (z >= {prefilter['min_z']}): {prefilter['unmarked_pass_rate']:.0%} of unmarked images pass, max z {prefilter['unmarked_max_z']}")
+    print(f"{Fore.CYAN} {report['pairs']} image/transform pairs from {report['embeds']} embeds in {report['elapsed_s']}s "
+          f"({report['pairs_per_s']} pairs/s, {report['config']['workers']} worker{'s' if report['config']['workers'] != 1 else ''})")
+    if report["errors"]:
+        print(f"{Fore.RED} {len(report['errors'])} embed(s) failed, e.g. {report['errors'][0]['source']}: {report['errors'][0]['error']}")
+
+
+def _parse_strategies(text):
+    strategies = []
+    for item in text.split(","):
+        noise_level, strength = item.split("/")
+        strategies.append((int(noise_level), int(strength)))
+    return tuple(strategies)
+
+
+def main(args):
+    transforms = tuple(args.transforms.split(",")) if args.transforms else tuple(TRANSFORMS)
+    unknown = [t for t in transforms if t not in TRANSFORMS]
+    if unknown:
+        print(f"{Fore.RED} Unknown transform(s): {', '.join(unknown)}. Available: {', '.join(TRANSFORMS)}")
+        return 2
+    strategies = _parse_strategies(args.strategies) if args.strategies else STRATEGIES
+
+    if args.corpus and not os.path.isdir(args.corpus):
+        print(f"{Fore.RED} Error: Not a directory.")
+        return 2
+    kinds = tuple(args.kinds.split(",")) if args.kinds else DEFAULT_KINDS
+    sizes = tuple(int(v) for v in args.sizes.split(",")) if args.sizes else (DEFAULT_SIZE,)
+    sources = build_corpus(args.corpus, args.recursive, args.include, args.exclude, kinds, sizes, args.seeds, args.limit)
+    if not sources:
+        print(f"{Fore.YELLOW} No images found.")
+        return 1
+
+    workers = resolve_workers(args.workers)
+    print(f"{Fore.CYAN} {len(sources)} image(s) x {len(strategies)} strategies x {len(transforms)} transforms "
+          f"= {len(sources) * len(strategies) * len(transforms)} pairs on {workers} worker{'s' if workers != 1 else ''}...")
+    report = run_robustness(sources, strategies, transforms, workers, args.max_side)
+    print_report(report)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{Fore.GREEN} Results saved to {args.output}")
+    return 0
@@ -0,0 +1,271 @@
+import os
+import sys
+import json
+import stat
+import signal
+import socket
+import secrets
+import urllib.parse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from colorama import Fore, Style
+
+from lookey_cli import (
+    iter_images, resolve_workers,
+    _init_server_worker, _serve_verify_job, _serve_sign_job
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+SIGN_MODES = ("standard", "deep")
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+TOKEN_HEADER = "X-Lookey-Token"
+TOKEN_FILE = "server_token"
+JSON_ENDPOINTS = ("/sign", "/batch")
+
+
+class LookeyService:
+    # One warm process pool shared by every request; each worker keeps its backend, contact index and key loaded.
+    def __init__(self, backend, workers):
+        self.backend = backend
+        self.workers = workers
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_server_worker, initargs=(cv_threads, backend.worker_options()))
+
+    def health(self):
+        self.backend.refresh_contacts()
+        return {
+            "status": "ok",
+            "user": self.backend.user_name,
+            "setup": self.backend.is_setup(),
+            "contacts": len(self.backend.contacts),
+            "workers": self.workers
+        }
+
+    def verify_path(self, image_path):
+        return self.pool.submit(_serve_verify_job, (image_path, None)).result()
+
+    def verify_upload(self, data):
+        record = self.pool.submit(_serve_verify_job, (None, data)).result()
+        record["path"] = None
+        return record
+
+    def sign(self, image_path, mode):
+        return self.pool.submit(_serve_sign_job, (image_path, mode)).result()
+
+    def batch(self, paths, mode):
+        # Bounded window like _pool_map, but on the long-lived pool.
+        func, jobs = (_serve_verify_job, ((p, None) for p in paths)) if mode == "verify" else (_serve_sign_job, ((p, mode) for p in paths))
+        pending = deque()
+        try:
+            for job in jobs:
+                pending.append(self.pool.submit(func, job))
+                if len(pending) >= self.workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class LookeyRequestHandler(BaseHTTPRequestHandler):
+    server_version = "Lookey"
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        if self.path == "/health":
+            return self._send_json(200, self.server.service.health())
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._allowed(require_token=True):
+            return
+        if self.path in JSON_ENDPOINTS and not self.headers.get("Content-Type", "").startswith("application/json"):
+            return self._send_json(415, {"error": "Content-Type must be application/json"})
+        service = self.server.service
+
+        try:
+            length = self._content_length()
+            if length > MAX_UPLOAD_BYTES:
+                return self._send_json(413, {"error": f"Upload larger than {MAX_UPLOAD_BYTES} bytes"})
+            body = self.rfile.read(length)
+
+            if self.path == "/verify":
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    return self._send_json(200, service.verify_path(self._require(json.loads(body), "path")))
+                if not body:
+                    return self._send_json(400, {"error": "Send image bytes or a JSON body with a path"})
+                return self._send_json(200, service.verify_upload(body))
+
+            if self.path == "/sign":
+                request = json.loads(body)
+                mode = request.get("mode", "deep")
+                if mode not in SIGN_MODES:
+                    return self._send_json(400, {"error": f"mode must be one of {', '.join(SIGN_MODES)}"})
+                result = service.sign(self._require(request, "path"), mode)
+                return self._send_json(200 if result["success"] else 422, result)
+
+            if self.path == "/batch":
+                request = json.loads(body)
+                mode = request.get("mode", "verify")
+                if mode not in ("verify",) + SIGN_MODES:
+                    return self._send_json(400, {"error": "mode must be verify, standard or deep"})
+                if "folder" in request:
+                    paths = iter_images(request["folder"], request.get("recursive", False), request.get("include"), request.get("exclude"), skip_outputs=mode != "verify")
+                else:
+                    paths = self._require(request, "paths")
+                return self._stream_ndjson(service.batch(paths, mode))
+
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            return self._send_json(500, {"error": str(e)})
+
+        self._send_json(404, {"error": "Not found"})
+
+    def _allowed(self, require_token=False):
+        # A web page can make the browser POST to localhost, so foreign Origins, rebound Host names and requests
+        # without this launch's token are refused. Unix sockets are out of a browser's reach and only need the checks below.
+        origin = self.headers.get("Origin")
+        if origin is not None and urllib.parse.urlsplit(origin).hostname not in self.server.allowed_hosts:
+            self._send_json(403, {"error": "Cross-origin requests are not allowed"})
+            return False
+        if self.server.token is None:
+            return True
+        host = urllib.parse.urlsplit("//" + self.headers.get("Host", "")).hostname
+        if host not in self.server.allowed_hosts:
+            self._send_json(403, {"error": "Host not allowed"})
+            return False
+        if require_token and not secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.server.token):
+            self._send_json(401, {"error": f"Missing or wrong {TOKEN_HEADER} header"})
+            return False
+        return True
+
+    def _content_length(self):
+        # A negative length would make rfile.read() block until the client hangs up.
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ValueError("Content-Length must be a non-negative integer")
+        return length
+
+    def _require(self, request, key):
+        if key not in request:
+            raise ValueError(f"Missing '{key}'")
+        return request[key]
+
+    def _send_json(self, code, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_ndjson(self, records):
+        # HTTP/1.0 without Content-Length: one JSON line per file as it finishes, then the connection closes.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        counts = {}
+        try:
+            for record in records:
+                status = record.get("status") or ("ok" if record.get("success") else "error")
+                counts[status] = counts.get(status, 0) + 1
+                self.wfile.write((json.dumps(record) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write((json.dumps({"summary": counts, "total": sum(counts.values())}) + "\n").encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            records.close()
+
+    def address_string(self):
+        # Unix socket peers have no host address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name = "lookey"
+        self.server_port = 0
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, quiet=False):
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not supported on this platform")
+        if os.path.lexists(socket_path):
+            # Only a stale socket from an earlier run may be replaced, never an ordinary file.
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise OSError(f"{socket_path} exists and is not a socket")
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, LookeyRequestHandler)
+        os.chmod(socket_path, 0o600)
+        server.token = None
+    else:
+        server = ThreadingHTTPServer((host, port), LookeyRequestHandler)
+        server.daemon_threads = True
+        server.token = secrets.token_urlsafe(32)
+    server.allowed_hosts = LOCAL_HOSTS + (host.strip("[]"),)
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def write_token(backend, token):
+    # Local clients read the launch token from the data dir, which only the user can read.
+    path = os.path.join(backend.data_dir, TOKEN_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return path
+
+
+def main(args, backend):
+    workers = resolve_workers(args.workers)
+    try:
+        server = make_server(None, args.host, args.port, args.socket, args.quiet)
+    except OSError as e:
+        print(f"{Fore.RED} Error: {e}")
+        return 1
+    service = server.service = LookeyService(backend, workers)
+    token_path = write_token(backend, server.token) if server.token else None
+    # SIGTERM (service managers, kill) takes the same cleanup path as Ctrl+C.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    where = args.socket if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    print(f"{Fore.CYAN} Lookey server listening on {where} ({workers} worker{'s' if workers != 1 else ''})")
+    if token_path:
+        print(f"{Style.DIM} POST requests need the {TOKEN_HEADER} header; this launch's token is in {token_path}")
+    print(f"{Style.DIM} Endpoints: GET /health, POST /verify, POST /sign, POST /batch. Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"{Fore.YELLOW} Shutting down...")
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        if token_path and os.path.exists(token_path):
+            os.remove(token_path)
+    return 0